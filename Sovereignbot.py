@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-import json
+from discord import app_commands
 import os
 from dotenv import load_dotenv  # Import dotenv for environment variables
 
@@ -8,38 +8,40 @@ from dotenv import load_dotenv  # Import dotenv for environment variables
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-DEFAULT_SERVER_CONFIG = {
-    "server_name": "New Server",
-    "abbreviation": "NS",
-    "channels": {
-        "attendance": None,
-        "deployment_announcement": None,
-        "promotion": None,
-        "demotion": None
-    },
-    "roles": {
-        "deployment_perms": "Deployment Perms",
-        "mod_perms": ["Mod Perms", "Admin", "Staff"],
-        "xp_roles": {
-            "Guest": 0
-        }
-    },
-    "blacklist": [],
-    "deployment_settings": {
-        "max_xp_limit": 150,
-        "default_attendance_timeout": 300,
-        "default_end_countdown": 1800
-    },
-    "xp_data": {},
-    "protected_roles": []
-}
-
-import json
-import os
+from cogs.utils import checks, db
+from cogs.utils.config import guild_config, new_server_config
+from cogs.utils.scheduler import TimerScheduler
+
+class SovereignTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        """ Blocks blacklisted users from every slash command """
+        if interaction.guild and checks.is_blacklisted(interaction.guild.id, interaction.user.id):
+            await interaction.response.send_message(f"⛔ **{interaction.user.display_name}, you are blacklisted from using this bot!**", ephemeral=True)
+            return False
+        return True
+
+class SovereignBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = TimerScheduler(self)
+        self.pool = None
+
+    async def setup_hook(self):
+        """ Creates bot-wide services before connecting """
+        self.pool = await db.create_pool()
+
+    async def close(self):
+        """ Disconnects and unloads the cogs, then stops bot-wide services and flushes pending config edits """
+        await super().close()  # Runs cog_unload, which may still flush XP, post summaries and read config
+        await self.scheduler.close()
+        await guild_config.close()
+        if self.pool is not None:
+            await self.pool.close()
 
 # Initialize bot with command prefix
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+bot = SovereignBot(command_prefix="!", intents=intents, help_command=None, tree_cls=SovereignTree)
+bot.add_check(checks.not_blacklisted)
 
 # Load all cogs dynamically
 COGS = ["cogs.Fundamentals", "cogs.Moderator", "cogs.XPSystem", "cogs.Blacklist", "cogs.Vote", "cogs.HelpCog", "cogs.AdminSettings", "cogs.Deployments", "cogs.MovGov", "cogs.Announcements", "cogs.AutoRole"]
@@ -57,29 +59,39 @@ async def load_cogs():
 async def on_ready():
     print(f"✅ Bot is online as {bot.user}!")
     await load_cogs()
+    await bot.scheduler.start()
     await bot.tree.sync()
 
 # Error Handling for Command Failures
 @bot.event
 async def on_command_error(ctx, error):
+    if isinstance(error, checks.Blacklisted):
+        # One notice per user per cooldown window; the rest are dropped and counted
+        if checks.blacklist_notices.should_notify(ctx.guild.id, ctx.author.id):
+            await ctx.send(str(error))
+        return
+    if isinstance(error, checks.MissingCapability):
+        await ctx.send(str(error))
+        return
     await ctx.send(f"⚠️ Error: {error}")
     print(f"Error in {ctx.command}: {error}")
 
+@bot.tree.error
+async def on_app_command_error(interaction, error):
+    message = str(error) if isinstance(error, checks.AppMissingCapability) else f"⚠️ Error: {error}"
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+    print(f"Error in /{interaction.command.name if interaction.command else '?'}: {error}")
+
 def register_server(guild_id):
     """ Auto-registers new servers with default config if missing """
-    server_info = load_server_info()
-
-    if str(guild_id) not in server_info:
-        # Assign default configuration to the new server
-        server_info[str(guild_id)] = DEFAULT_SERVER_CONFIG
-        server_info[str(guild_id)]["server_name"] = "Unknown Server"
-        
-        with open(SERVER_INFO_FILE, "w") as file:
-            json.dump(server_info, file, indent=4)
-
+    # Assign default configuration to the new server
+    if guild_config.register(guild_id, new_server_config("Unknown Server")):
         print(f"✅ New server registered: {guild_id}")
 
-    return server_info[str(guild_id)]
+    return guild_config.guild(guild_id).data
 
 @bot.event
 async def on_guild_join(guild):
@@ -94,22 +106,6 @@ async def on_guild_join(guild):
             reason="Automatic creation of Sovereign Perms role"
         )
 
-SERVER_INFO_FILE = "server_info.json"
-
-def load_server_info():
-    """ Load server settings from JSON, handling empty or missing files """
-    if not os.path.exists(SERVER_INFO_FILE):
-        return {}
-
-    with open(SERVER_INFO_FILE, "r") as file:
-        try:
-            data = json.load(file)
-        except json.JSONDecodeError:
-            print("⚠️ JSON file is empty or invalid. Initializing blank config.")
-            data = {}
-
-    return data
-
 # Run the bot
 if TOKEN:
     bot.run(TOKEN)
@@ -2,6 +2,10 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
+import asyncio
+
+from cogs.utils.config import GUILD_CONFIG_DB, SERVER_INFO_FILE, SQLiteConfigBackend, guild_config, migrate_json_to_sqlite
+
 class AdminSettings(commands.Cog):
     """ Admin tools for managing bot settings dynamically """
 
@@ -64,6 +68,39 @@ class AdminSettings(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"⚠️ Failed to reload `{cog_name}`:\n```{e}```", ephemeral=True)
 
+    @commands.command(name="reload_config")
+    @commands.has_permissions(administrator=True)
+    async def reload_config(self, ctx):
+        """ Re-reads the server configuration file from disk (Prefix Command) """
+        await guild_config.flush()  # reload() drops unflushed edits
+        guild_config.reload()
+        await ctx.send(f"✅ **Server configuration reloaded!** ({len(guild_config.guild_ids())} servers)")
+
+    @app_commands.command(name="reload_config", description="Re-reads the server configuration file from disk")
+    async def reload_config_slash(self, interaction: discord.Interaction):
+        """ Re-reads the server configuration file from disk (Slash Command) """
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("⛔ You need **Administrator** permissions to reload the configuration.", ephemeral=True)
+            return
+
+        await guild_config.flush()  # reload() drops unflushed edits
+        guild_config.reload()
+        await interaction.response.send_message(f"✅ **Server configuration reloaded!** ({len(guild_config.guild_ids())} servers)", ephemeral=True)
+
+    @commands.command(name="migrate_config")
+    @commands.is_owner()
+    async def migrate_config(self, ctx, force: bool = False):
+        """ Imports Server_info.json into the SQLite config store; servers already in it are kept unless forced (Bot Owner only) """
+        await guild_config.flush()
+        count, skipped = await asyncio.to_thread(migrate_json_to_sqlite, SERVER_INFO_FILE, GUILD_CONFIG_DB, force)
+        kept = f" Kept {skipped} servers already in SQLite (use `!migrate_config true` to overwrite them)." if skipped else ""
+
+        if isinstance(guild_config.backend, SQLiteConfigBackend):
+            guild_config.reload()
+            await ctx.send(f"✅ **Imported {count} servers into the SQLite config store.**{kept}")
+        else:
+            await ctx.send(f"✅ **Imported {count} servers into `{GUILD_CONFIG_DB}`.**{kept} Set `GUILD_CONFIG_BACKEND=sqlite` and restart to use it.")
+
     @commands.command()
     async def setup_sovereign_perms(self, ctx):
         """ Creates or ensures the Sovereign Perms role exists """
@@ -1,191 +1,207 @@
 import discord
 from discord.ext import commands
-import json
-import os
 import asyncio
-
-SERVER_INFO_FILE = os.path.expanduser("~/SovereignBot/Server_info.json")
-
-def load_server_info():
-    """ Loads server configuration from JSON file """
-    if os.path.exists(SERVER_INFO_FILE):
-        with open(SERVER_INFO_FILE, "r") as file:
-            return json.load(file)
-    return {}
-
-def get_server_setting(guild_id, setting, default=None):
-    """ Safely retrieves a configuration setting for the guild """
-    server_info = load_server_info()
-    guild_data = server_info.get(str(guild_id), {})
-
-    # Debugging: Print what’s actually being found
-    print(f"🔍 Searching JSON for server {guild_id}")
-    print(f"🔍 Retrieved Data: {guild_data}")
-
-    return guild_data.get(setting, default)
-
-def save_server_info(data):
-    """ Saves updated server configuration to JSON file """
-    with open(SERVER_INFO_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+import csv
+import io
+import json
+import re
+
+from cogs.utils import checks
+from cogs.utils.config import guild_config
+from cogs.utils.paginator import EmbedPages
+
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+EXPORT_IDS_PER_FILE = 100_000
+SNOWFLAKE = re.compile(r"^\d{15,21}$")
+
+def parse_user_ids(filename, raw):
+    """ Extracts user IDs from a CSV or JSON attachment without resolving members """
+    text = raw.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("blacklist", data.get("user_ids", []))
+        values = [entry.get("user_id", entry.get("id")) if isinstance(entry, dict) else entry for entry in data]
+    else:
+        values = [cell for row in csv.reader(io.StringIO(text)) for cell in row[:1]]
+
+    # Keep file order, drop duplicates and anything that isn't a snowflake (e.g. a CSV header)
+    return list(dict.fromkeys(str(value).strip() for value in values if SNOWFLAKE.match(str(value).strip())))
+
+def render_export(user_ids, file_format):
+    """ Renders user IDs as one or more export files, EXPORT_IDS_PER_FILE IDs each """
+    files = []
+    for start in range(0, len(user_ids), EXPORT_IDS_PER_FILE):
+        chunk = user_ids[start:start + EXPORT_IDS_PER_FILE]
+        if file_format == "json":
+            body = json.dumps({"blacklist": chunk})
+        else:
+            body = "user_id\n" + "\n".join(chunk) + "\n"
+        files.append(body.encode())
+    return files
 
 class Blacklist(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def has_mod_perms(self, ctx):
-        """ Checks if the user has ANY of the listed mod roles from JSON """
-        mod_roles = get_server_setting(ctx.guild.id, "roles")["mod_perms"]
-        return any(discord.utils.get(ctx.author.roles, name=role) for role in mod_roles)
-
     def is_blacklisted(self, user_id, guild_id):
         """ Checks if the user is blacklisted in this server """
-        blacklisted_users = get_server_setting(guild_id, "blacklist")
-        return str(user_id) in blacklisted_users if blacklisted_users else False
+        return checks.is_blacklisted(guild_id, user_id)
+
+    def remove_from_blacklist(self, user_id, guild_id):
+        """ Removes the user from the in-memory blacklist; returns False if they weren't on it """
+        if not self.is_blacklisted(user_id, guild_id):
+            return False
+        # Older configs may hold IDs as ints, so drop every entry matching the ID in either form
+        entries = guild_config.edit(guild_id)["blacklist"]
+        entries[:] = [entry for entry in entries if str(entry) != str(user_id)]
+        return True
 
     @commands.command()
+    @checks.mod_perms()
     async def blacklist(self, ctx, member: discord.Member):
         """ Adds a user to the blacklist (Only Mod Perms users) """
-        if not self.has_mod_perms(ctx):
-            await ctx.send("⛔ You need the **Mod Perms** role to use this command.")
-            return
-
-        guild_id = str(ctx.guild.id)
-        server_info = load_server_info()
-
-        if guild_id not in server_info:
-            server_info[guild_id] = {"blacklist": []}
-
-        blacklisted_users = server_info[guild_id].get("blacklist", [])
-        if str(member.id) in blacklisted_users:
+        if self.is_blacklisted(member.id, ctx.guild.id):
             await ctx.send(f"⚠️ **{member.display_name}** is already blacklisted!")
             return
 
-        blacklisted_users.append(str(member.id))
-        server_info[guild_id]["blacklist"] = blacklisted_users
-        save_server_info(server_info)
+        guild_config.edit(ctx.guild.id).setdefault("blacklist", []).append(str(member.id))
 
         await ctx.send(f"🚫 **{member.display_name}** has been added to the bot blacklist!")
 
     @commands.command()
+    @checks.mod_perms()
     async def unblacklist(self, ctx, member: discord.Member):
         """ Removes a user from the blacklist (Only Mod Perms users) """
-        if not self.has_mod_perms(ctx):
-            await ctx.send("⛔ You need the **Mod Perms** role to use this command.")
-            return
-
-        guild_id = str(ctx.guild.id)
-        server_info = load_server_info()
-
-        blacklisted_users = server_info.get(guild_id, {}).get("blacklist", [])
-        if str(member.id) not in blacklisted_users:
+        if not self.remove_from_blacklist(member.id, ctx.guild.id):
             await ctx.send(f"✅ **{member.display_name}** is not blacklisted.")
             return
 
-        blacklisted_users.remove(str(member.id))
-        server_info[guild_id]["blacklist"] = blacklisted_users
-        save_server_info(server_info)
+        await self.bot.scheduler.cancel_matching("temp_blacklist", guild_id=ctx.guild.id, user_id=member.id)
 
         await ctx.send(f"✅ **{member.display_name}** has been removed from the bot blacklist.")
     
     @commands.command()
-    async def temp_blacklist(self, ctx, member: discord.Member, duration: int):
-        """ Temporarily blacklists a user for the specified duration """
-        if not self.has_mod_perms(ctx):
-            await ctx.send("⛔ You need the **Mod Perms** role to use this command.")
+    @checks.mod_perms()
+    async def blacklist_list(self, ctx):
+        """ Displays the list of blacklisted users """
+        blacklisted_users = guild_config.guild(ctx.guild.id).blacklist
+
+        if not blacklisted_users:
+            await ctx.send("✅ No blacklisted users in this server.")
             return
 
-        guild_id = str(ctx.guild.id)
-        server_info = load_server_info()
+        pages = EmbedPages(
+            ctx.author.id,
+            f"🚫 Blacklisted Users ({len(blacklisted_users)})",
+            [f"- <@{user_id}> (`{user_id}`)" for user_id in blacklisted_users],
+            color=discord.Color.red()
+        )
+        await pages.send(ctx)
 
-        if guild_id not in server_info:
-            server_info[guild_id] = {"blacklist": []}
+    @commands.command()
+    @checks.mod_perms()
+    async def blacklist_import(self, ctx):
+        """ Imports user IDs from an attached CSV/JSON file into the blacklist in one batch """
+        if not ctx.message.attachments:
+            await ctx.send("⚠️ Attach a `.csv` (one user ID per row) or `.json` (list of user IDs) file.")
+            return
 
-        blacklisted_users = server_info[guild_id].get("blacklist", [])
-        if str(member.id) in blacklisted_users:
-            await ctx.send(f"⚠️ **{member.display_name}** is already blacklisted!")
+        attachment = ctx.message.attachments[0]
+        if attachment.size > MAX_IMPORT_BYTES:
+            await ctx.send(f"⚠️ Import files are limited to {MAX_IMPORT_BYTES // (1024 * 1024)} MB.")
             return
 
-        blacklisted_users.append(str(member.id))
-        server_info[guild_id]["blacklist"] = blacklisted_users
-        save_server_info(server_info)
+        raw = await attachment.read()
+        try:
+            user_ids = await asyncio.to_thread(parse_user_ids, attachment.filename, raw)
+        except (ValueError, TypeError, AttributeError) as e:
+            await ctx.send(f"⚠️ Couldn't parse `{attachment.filename}`: {e}")
+            return
 
-        await ctx.send(f"⏳ **{member.display_name}** is blacklisted for {duration} minutes!")
+        existing = checks.blacklist.users(ctx.guild.id)
+        new_ids = [user_id for user_id in user_ids if int(user_id) not in existing]
+        if new_ids:
+            guild_config.edit(ctx.guild.id).setdefault("blacklist", []).extend(new_ids)
+            await guild_config.flush()
 
-        # Run unblacklist logic asynchronously to avoid blocking execution
-        async def remove_blacklist():
-            await asyncio.sleep(duration * 60)
-            blacklisted_users.remove(str(member.id))
-            server_info[guild_id]["blacklist"] = blacklisted_users
-            save_server_info(server_info)
-            await ctx.send(f"✅ **{member.display_name}** has been removed from the bot blacklist!")
+        await ctx.send(
+            f"🚫 **Imported {len(new_ids)} users** into the blacklist "
+            f"({len(user_ids) - len(new_ids)} already listed, {len(existing) + len(new_ids)} total)."
+        )
 
-        # Schedule background task
-        asyncio.create_task(remove_blacklist())
-    
     @commands.command()
-    async def blacklist_list(self, ctx):
-        """ Displays the list of blacklisted users """
-        if not self.has_mod_perms(ctx):
-            await ctx.send("⛔ You need the **Mod Perms** role to use this command.")
+    @checks.mod_perms()
+    async def blacklist_export(self, ctx, file_format: str = "csv"):
+        """ Exports the blacklist as CSV or JSON attachments """
+        file_format = file_format.lower()
+        if file_format not in ("csv", "json"):
+            await ctx.send("⚠️ Export format must be `csv` or `json`.")
             return
 
-        guild_id = str(ctx.guild.id)
-        blacklisted_users = get_server_setting(guild_id, "blacklist")
-
-        if not blacklisted_users:
+        user_ids = [str(user_id) for user_id in guild_config.guild(ctx.guild.id).blacklist]
+        if not user_ids:
             await ctx.send("✅ No blacklisted users in this server.")
             return
 
-        user_list = "\n".join([f"- <@{user_id}>" for user_id in blacklisted_users])
-        embed = discord.Embed(title="🚫 Blacklisted Users", description=user_list, color=discord.Color.red())
+        files = await asyncio.to_thread(render_export, user_ids, file_format)
+        for number, body in enumerate(files, start=1):
+            suffix = f"_{number}" if len(files) > 1 else ""
+            await ctx.send(
+                f"📦 Blacklist export {number}/{len(files)}" if len(files) > 1 else f"📦 Blacklist export ({len(user_ids)} users)",
+                file=discord.File(io.BytesIO(body), filename=f"blacklist_{ctx.guild.id}{suffix}.{file_format}")
+            )
+
+    @commands.command()
+    @checks.mod_perms()
+    async def blacklist_stats(self, ctx):
+        """ Shows how many blacklist notices were sent or suppressed by the cooldown """
+        notices = checks.blacklist_notices
+        guild_id = ctx.guild.id
+        embed = discord.Embed(title="📊 Blacklist Notice Stats", color=discord.Color.orange())
+        embed.add_field(name="📨 Notices sent", value=str(notices.sent[guild_id]))
+        embed.add_field(name="🔕 Suppressed", value=str(notices.suppressed[guild_id]))
+
+        active = sorted(notices.active(guild_id), key=lambda entry: entry[1], reverse=True)[:10]
+        if active:
+            embed.add_field(
+                name="⏳ In cooldown now",
+                value="\n".join(f"- <@{user_id}>: {count} suppressed" for user_id, count in active),
+                inline=False
+            )
         await ctx.send(embed=embed)
 
     @commands.command()
+    @checks.mod_perms()
     async def temp_blacklist(self, ctx, member: discord.Member, duration: int):
-        """ Temporarily blacklists a user for the specified duration (Only Mod Perms users) """
-        if not self.has_mod_perms(ctx):
-            await ctx.send("⛔ You need the **Mod Perms** role to use this command.")
-            return
-
-        guild_id = str(ctx.guild.id)
-        server_info = load_server_info()
-
-        if guild_id not in server_info:
-            server_info[guild_id] = {"blacklist": []}
-
-        blacklisted_users = server_info[guild_id].get("blacklist", [])
-        if str(member.id) in blacklisted_users:
+        """ Temporarily blacklists a user for the specified duration in minutes (Only Mod Perms users) """
+        if self.is_blacklisted(member.id, ctx.guild.id):
             await ctx.send(f"⚠️ **{member.display_name}** is already blacklisted!")
             return
 
-        blacklisted_users.append(str(member.id))
-        server_info[guild_id]["blacklist"] = blacklisted_users
-        save_server_info(server_info)
+        guild_config.edit(ctx.guild.id).setdefault("blacklist", []).append(str(member.id))
+        try:
+            await self.bot.scheduler.create(
+                "temp_blacklist", duration * 60,
+                guild_id=ctx.guild.id, user_id=member.id, channel_id=ctx.channel.id
+            )
+        except Exception:
+            # Without its timer the entry would never be lifted
+            self.remove_from_blacklist(member.id, ctx.guild.id)
+            raise
 
         await ctx.send(f"⏳ **{member.display_name}** is blacklisted for {duration} minutes!")
 
-        await asyncio.sleep(duration * 60)  # Wait for the duration to pass
-
-        # Remove user after the time period ends
-        blacklisted_users.remove(str(member.id))
-        server_info[guild_id]["blacklist"] = blacklisted_users
-        save_server_info(server_info)
-
-        await ctx.send(f"✅ **{member.display_name}** has been removed from the bot blacklist!")
-
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """ Blocks blacklisted users from using any bot commands """
-        if message.author.bot:
-            return  # Ignore bot messages
-
-        guild_id = str(message.guild.id)
-        blacklisted_users = get_server_setting(guild_id, "blacklist")
-
-        if blacklisted_users and str(message.author.id) in blacklisted_users:
-            await message.channel.send(f"⛔ **{message.author.display_name}, you are blacklisted from using this bot!**")
+    async def on_temp_blacklist_timer_complete(self, timer):
+        """ Lifts a temporary blacklist once its timer fires (survives restarts) """
+        guild_id, user_id = timer.payload["guild_id"], timer.payload["user_id"]
+        if not self.remove_from_blacklist(user_id, guild_id):
             return
 
+        channel = self.bot.get_channel(timer.payload.get("channel_id"))
+        if channel:
+            await channel.send(f"✅ <@{user_id}> has been removed from the bot blacklist!")
+
 async def setup(bot):
     await bot.add_cog(Blacklist(bot))
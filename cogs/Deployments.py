@@ -1,123 +1,267 @@
 import discord
 from discord.ext import commands
 import asyncio
+import datetime
 import time
-import json
-import os
 
-SERVER_INFO_FILE = os.path.expanduser("~/SovereignBot/Server_info.json")
+from cogs.utils import checks
+from cogs.utils.autocomplete import system_name_autocomplete
+from cogs.utils.config import guild_config
+from cogs.utils.deployment_store import DeploymentStore, week_of, week_start
+from cogs.utils.voice_attendance import VoiceAttendance
 
-def load_server_info():
-    """ Loads server configuration from JSON file """
-    if os.path.exists(SERVER_INFO_FILE):
-        with open(SERVER_INFO_FILE, "r") as file:
-            return json.load(file)
-    return {}
+IDLE, ACTIVE, ENDING, ENDED = "idle", "active", "ending", "ended"
+APPROVE_EMOJI = "👍"
+STATS_DEFAULT_WEEKS = 12
+STATS_TOP_ATTENDEES = 10
 
-def get_server_setting(guild_id, setting, default={}):
-    """ Safely retrieves a configuration setting for the guild """
-    print(f"🔍 Bot detected server ID: {ctx.guild.id}")
-    server_info = load_server_info()
-    guild_data = server_info.get(str(guild_id), {})
 
-    # Debugging: Print what’s actually being found
-    print(f"🔍 Searching JSON for server {guild_id}")
-    print(f"🔍 Retrieved Data: {guild_data}")
+class Deployment:
+    """ One guild's deployment: idle -> active -> ending (countdown) -> ended.
+
+    Members can register while it is active or ending, either through an
+    approved request or by spending the configured minimum time in voice.
+    Each guild's record has its own lock, so transitions in one guild never
+    wait on another.
+    """
+
+    __slots__ = ("guild_id", "state", "deployment_id", "host_id", "started_at", "ends_at", "ended_at", "attendance",
+                 "pending", "voice", "voice_minutes", "awarded", "lock")
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.state = IDLE
+        self.deployment_id = None  # Its row in the deployment history
+        self.host_id = None
+        self.started_at = None
+        self.ends_at = None  # Set while ending
+        self.ended_at = None
+        self.attendance = set()  # Member IDs
+        self.pending = {}  # member_id -> attendance request message ID
+        self.voice = None  # VoiceAttendance while open
+        self.voice_minutes = {}  # member_id -> minutes in voice, set when the deployment ends
+        self.awarded = set()  # Member IDs already paid deployment XP
+        self.lock = asyncio.Lock()
+
+    @property
+    def open(self):
+        return self.state in (ACTIVE, ENDING)
+
+    def start(self, host_id, voice):
+        self.state = ACTIVE
+        self.deployment_id = None
+        self.host_id = host_id
+        self.started_at = time.time()
+        self.ends_at = self.ended_at = None
+        self.attendance = set()
+        self.pending = {}
+        self.voice = voice
+        self.voice_minutes = {}
+        self.awarded = set()
+
+    def finish(self, min_voice_minutes):
+        """ Ends the deployment and credits attendance from voice; returns how many members voice credited """
+        self.state = ENDED
+        self.ends_at = None
+        self.ended_at = time.time()
+        if self.voice is None:
+            return 0
+        self.voice.close(self.ended_at)
+        self.voice_minutes = self.voice.minutes()
+        self.voice = None
+        credited = {member_id for member_id, minutes in self.voice_minutes.items() if minutes >= min_voice_minutes}
+        self.attendance |= credited
+        return len(credited)
+
+
+class AttendanceRequest:
+    """ A pending ``.deployment_attend`` request, waiting for a 👍 on its message """
+
+    __slots__ = ("message_id", "guild_id", "channel_id", "member_id", "display_name", "started_at")
+
+    def __init__(self, message_id, guild_id, channel_id, member_id, display_name, started_at):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.member_id = member_id
+        self.display_name = display_name
+        self.started_at = started_at  # Identifies the deployment the request belongs to
 
-    return guild_data.get(setting, default)
 
 class Deployments(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.DeploymentActive = False
-        self.DeploymentStartTime = None
-        self.DeploymentEndTime = None
-        self.DeploymentAttendance = []
+        self.store = DeploymentStore()
+        self.deployments = {}  # guild_id -> Deployment
+        self.attendance_requests = {}  # message_id -> AttendanceRequest, across all guilds
 
-    def has_deployment_perms(self, ctx):
-        """ Check if the user has the Deployment_Perms role dynamically from JSON """
-        deployment_role_name = get_server_setting(ctx.guild.id, "roles")["deployment_perms"]
-        return discord.utils.get(ctx.author.roles, name=deployment_role_name) is not None
+    async def cog_load(self):
+        orphans = await self.store.close_orphans()
+        if orphans:
+            print(f"Closed {orphans} deployment(s) interrupted by a restart.")
+
+    async def cog_unload(self):
+        await self.store.close()
+
+    def deployment(self, guild_id):
+        deployment = self.deployments.get(guild_id)
+        if deployment is None:
+            deployment = self.deployments[guild_id] = Deployment(guild_id)
+        return deployment
 
     @commands.command()
+    @checks.deployment_perms()
     async def deployment_start(self, ctx):
         """ Start a deployment and send an announcement to the deployment channel """
-        if not self.has_deployment_perms(ctx):
-            await ctx.send("⛔ You need the **Deployment Perms** role to start a deployment.")
-            return
-
-        self.DeploymentActive = True
-        self.DeploymentStartTime = time.time()
+        deployment = self.deployment(ctx.guild.id)
+        async with deployment.lock:
+            if deployment.open:
+                await ctx.send("⚠️ A deployment is already running. Use `.deployment_end` or `.deployment_cancel` first.")
+                return
+            voice = VoiceAttendance(guild_config.guild(ctx.guild.id).deployment_setting("voice_channels"))
+            for channel in ctx.guild.voice_channels:  # Members already in voice start counting now
+                if voice.tracks(channel):
+                    for member in channel.members:
+                        if not member.bot:
+                            voice.join(member.id, time.time())
+            deployment.start(ctx.author.id, voice)
+            deployment.deployment_id = await self.store.start(ctx.guild.id, ctx.author.id, deployment.started_at)
 
-        deployment_channel_id = get_server_setting(ctx.guild.id, "channels")["deployment_announcement"]
+        deployment_channel_id = guild_config.guild(ctx.guild.id).channel("deployment_announcement")
         deployment_channel = self.bot.get_channel(deployment_channel_id)
         
         if deployment_channel:
             await deployment_channel.send(
                 "# MPA Deployment #\n"
                 "**We are now deployed! Join our Voice Chat for easy communication.**\n"
-                "- Please run `.deployment_attend` so we can register your XP.\n"
+                "- Time in voice chat registers your attendance automatically. Not in voice? Run `.deployment_attend`.\n"
                 "@everyone"
             )
 
         await ctx.send("✅ **Deployment has started!** Related commands are now active.")
 
     @commands.command()
+    @checks.deployment_perms()
     async def deployment_end(self, ctx):
         """ End deployment with a countdown (Only Deployment_Perms users) """
-        if not self.has_deployment_perms(ctx):
-            await ctx.send("⛔ You need the **Deployment_Perms** role to end a deployment.")
-            return
-
-        countdown_duration = get_server_setting(ctx.guild.id, "deployment_settings")["default_end_countdown"]
-        self.DeploymentEndTime = time.time() + countdown_duration
+        deployment = self.deployment(ctx.guild.id)
+        countdown_duration = guild_config.guild(ctx.guild.id).deployment_setting("default_end_countdown")
+        async with deployment.lock:
+            if deployment.state != ACTIVE:
+                await ctx.send("⚠️ There is no active deployment to end." if deployment.state != ENDING else "⚠️ Deployment is already ending.")
+                return
+            deployment.state = ENDING
+            deployment.ends_at = time.time() + countdown_duration
+            await self.bot.scheduler.create(
+                "deployment_end", countdown_duration,
+                guild_id=ctx.guild.id, channel_id=ctx.channel.id, started_at=deployment.started_at
+            )
 
         await ctx.send(f"⏳ **Deployment will end in {countdown_duration // 60} minutes...**")
-        await asyncio.sleep(countdown_duration)
 
-        self.DeploymentActive = False
-        self.DeploymentEndTime = None
-        await ctx.send("❌ **Deployment has ended!** Commands are now disabled.")
+    @commands.Cog.listener()
+    async def on_deployment_end_timer_complete(self, timer):
+        """ Ends a deployment once its countdown runs out """
+        deployment = self.deployments.get(timer.payload["guild_id"])
+        if deployment is None:
+            return  # Deployment state doesn't survive restarts
+        async with deployment.lock:
+            if deployment.state != ENDING or deployment.started_at != timer.payload["started_at"]:
+                return
+            credited = await self.finish(deployment)
+
+        channel = self.bot.get_channel(timer.payload.get("channel_id"))
+        if channel:
+            await channel.send(f"❌ **Deployment has ended!** Commands are now disabled.\n{self.voice_summary(deployment, credited)}")
+
+    async def finish(self, deployment):
+        """ Ends a deployment and writes it to the history; returns how many members voice credited """
+        credited = deployment.finish(guild_config.guild(deployment.guild_id).deployment_setting("min_voice_minutes"))
+        if deployment.deployment_id is None:
+            return credited
+        await self.store.finish(
+            deployment.deployment_id, deployment.guild_id, deployment.started_at, deployment.ended_at,
+            deployment.attendance, deployment.voice_minutes
+        )
+        return credited
+
+    def voice_summary(self, deployment, credited):
+        minimum = guild_config.guild(deployment.guild_id).deployment_setting("min_voice_minutes")
+        return f"🎧 **{credited}** members were registered for spending at least {minimum} minutes in voice."
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """ Tracks time in the deployment's voice channels; moves between tracked channels don't break a session """
+        deployment = self.deployments.get(member.guild.id)
+        if deployment is None or deployment.voice is None or member.bot:
+            return
+        was_in, now_in = deployment.voice.tracks(before.channel), deployment.voice.tracks(after.channel)
+        if now_in and not was_in:
+            deployment.voice.join(member.id, time.time())
+        elif was_in and not now_in:
+            deployment.voice.leave(member.id, time.time())
 
     @commands.command()
     async def deployment_status(self, ctx):
         """ Check deployment status & countdown time for XP registration """
-        if self.DeploymentEndTime:
-            time_left = int(self.DeploymentEndTime - time.time())
+        deployment = self.deployment(ctx.guild.id)
+        if deployment.state == ENDING:
+            time_left = max(0, int(deployment.ends_at - time.time()))
             minutes, seconds = divmod(time_left, 60)
             await ctx.send(f"⏳ **{minutes}m {seconds}s left to register for XP!**")
+        elif deployment.state == ACTIVE:
+            await ctx.send("✅ **Deployment is active.** XP registration is open until the deployment ends.")
         else:
             await ctx.send("❌ **No Active Deployment.** No active XP registration period.")
 
     @commands.command()
+    @checks.deployment_perms()
     async def deployment_extend(self, ctx, extra_minutes: int):
         """ Extend deployment duration dynamically """
-        if not self.has_deployment_perms(ctx):
-            await ctx.send("⛔ You need the **Deployment_Perms** role to extend a deployment.")
+        if extra_minutes <= 0:
+            await ctx.send("⚠️ Extra minutes must be positive.")
             return
-
-        if self.DeploymentEndTime:
-            self.DeploymentEndTime += extra_minutes * 60
-            await ctx.send(f"⏳ **Deployment extended by {extra_minutes} minutes!**")
-        else:
-            await ctx.send("⚠️ Deployment does not have a countdown. Use `.deployment_end` first.")
+        deployment = self.deployment(ctx.guild.id)
+        async with deployment.lock:
+            if deployment.state != ENDING:
+                await ctx.send("⚠️ Deployment does not have a countdown. Use `.deployment_end` first.")
+                return
+            deployment.ends_at += extra_minutes * 60
+            await self.bot.scheduler.cancel_matching("deployment_end", guild_id=ctx.guild.id)
+            await self.bot.scheduler.create(
+                "deployment_end", max(0, deployment.ends_at - time.time()),
+                guild_id=ctx.guild.id, channel_id=ctx.channel.id, started_at=deployment.started_at
+            )
+        await ctx.send(f"⏳ **Deployment extended by {extra_minutes} minutes!**")
 
     @commands.command()
+    @checks.deployment_perms()
     async def deployment_cancel(self, ctx):
         """ Immediately cancel deployment """
-        if not self.has_deployment_perms(ctx):
-            await ctx.send("⛔ You need the **Deployment_Perms** role to cancel a deployment.")
-            return
-
-        self.DeploymentActive = False
-        self.DeploymentEndTime = None
-        await ctx.send("❌ **Deployment has been force-ended!** All related commands are now disabled.")
+        deployment = self.deployment(ctx.guild.id)
+        async with deployment.lock:
+            if not deployment.open:
+                await ctx.send("⚠️ There is no deployment to cancel.")
+                return
+            credited = await self.finish(deployment)
+            await self.bot.scheduler.cancel_matching("deployment_end", guild_id=ctx.guild.id)
+        await ctx.send(f"❌ **Deployment has been force-ended!** All related commands are now disabled.\n{self.voice_summary(deployment, credited)}")
 
     @commands.command()
     async def deployment_attend(self, ctx):
         """ Fetch attendance channel dynamically & allow registration """
         guild_id = ctx.guild.id
-        attendance_channel_id = get_server_setting(guild_id, "channels")["attendance"]
+        deployment = self.deployment(guild_id)
+        if not deployment.open:
+            await ctx.send("❌ **No Active Deployment.** Attendance registration is closed.")
+            return
+        if ctx.author.id in deployment.attendance:
+            await ctx.send("✅ Your attendance is already recorded.")
+            return
+        if ctx.author.id in deployment.pending:
+            await ctx.send("⏳ Your attendance request is still waiting for approval.")
+            return
+        attendance_channel_id = guild_config.guild(guild_id).channel("attendance")
 
         if attendance_channel_id:
             attendance_channel = self.bot.get_channel(attendance_channel_id)
@@ -126,78 +270,280 @@ class Deployments(commands.Cog):
                 return
             
             message = await attendance_channel.send(
-                f"📢 **{ctx.author.display_name}** wants to confirm deployment attendance! React with 👍 to approve."
+                f"📢 **{ctx.author.display_name}** wants to confirm deployment attendance! React with {APPROVE_EMOJI} to approve."
             )
-
-            def check(reaction, user):
-                return str(reaction.emoji) == "👍" and self.has_deployment_perms(ctx)
-
-            try:
-                await self.bot.wait_for("reaction_add", timeout=300, check=check)
-                self.DeploymentAttendance.append(ctx.author.display_name)
-                await attendance_channel.send(f"✅ **{ctx.author.display_name} attended the deployment!**")
-            except asyncio.TimeoutError:
-                await attendance_channel.send(f"⚠️ Attendance request by {ctx.author.display_name} expired.")
+            self.attendance_requests[message.id] = AttendanceRequest(
+                message.id, guild_id, attendance_channel.id, ctx.author.id, ctx.author.display_name, deployment.started_at
+            )
+            deployment.pending[ctx.author.id] = message.id
+            timeout = guild_config.guild(guild_id).deployment_setting("default_attendance_timeout")
+            await self.bot.scheduler.create("attendance_request", timeout, message_id=message.id)
+            await ctx.send("📢 **Attendance request sent!** A deployment lead will confirm it.")
         else:
             await ctx.send("⚠️ Attendance channel is not configured for this server.")
 
+    def pop_request(self, message_id):
+        """ Removes a pending request from the index and its deployment; None if it's gone """
+        request = self.attendance_requests.pop(message_id, None)
+        if request is not None:
+            deployment = self.deployments.get(request.guild_id)
+            if deployment is not None and deployment.pending.get(request.member_id) == message_id:
+                del deployment.pending[request.member_id]
+        return request
+
+    async def record_attendance(self, guild_id, requests):
+        """ Adds approved requests' members to their deployment; returns the requests whose deployment wasn't replaced """
+        deployment = self.deployment(guild_id)
+        approved = [request for request in requests if request.started_at == deployment.started_at]
+        deployment.attendance.update(request.member_id for request in approved)
+        if approved and deployment.state == ENDED:  # Already in the history; append the late approvals
+            await self.store.add_attendees(
+                deployment.deployment_id, guild_id, deployment.started_at, [request.member_id for request in approved]
+            )
+        return approved
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        """ Approves attendance when a deployment lead reacts 👍 to a pending request """
+        request = self.attendance_requests.get(payload.message_id)
+        if request is None or str(payload.emoji) != APPROVE_EMOJI:
+            return
+        if payload.member is None or payload.member.bot or not checks.permissions.allowed(payload.member, "deployment_perms"):
+            return
+        if self.pop_request(payload.message_id) is None:
+            return  # Another approval got there first
+        await self.bot.scheduler.cancel_matching("attendance_request", message_id=payload.message_id)
+
+        channel = self.bot.get_channel(request.channel_id)
+        if not await self.record_attendance(request.guild_id, [request]):
+            if channel:
+                await channel.send(f"⚠️ Attendance request by {request.display_name} belongs to a deployment that has ended.")
+            return
+        if channel:
+            await channel.send(f"✅ **{request.display_name} attended the deployment!**")
+
+    @commands.Cog.listener()
+    async def on_attendance_request_timer_complete(self, timer):
+        """ Expires an attendance request nobody approved in time """
+        request = self.pop_request(timer.payload["message_id"])
+        if request is None:
+            return  # Approved already, or lost in a restart
+        channel = self.bot.get_channel(request.channel_id)
+        if channel:
+            await channel.send(f"⚠️ Attendance request by {request.display_name} expired.")
+
+    @commands.command()
+    @checks.deployment_perms()
+    async def deployment_approve_all(self, ctx):
+        """ Approve every pending attendance request for this server's deployment """
+        deployment = self.deployment(ctx.guild.id)
+        requests = [self.pop_request(message_id) for message_id in list(deployment.pending.values())]
+        requests = [request for request in requests if request is not None]
+        if not requests:
+            await ctx.send("📭 There are no pending attendance requests.")
+            return
+
+        approved = await self.record_attendance(ctx.guild.id, requests)
+        for request in requests:
+            await self.bot.scheduler.cancel_matching("attendance_request", message_id=request.message_id)
+        names = ", ".join(request.display_name for request in approved)
+        await ctx.send(f"✅ **Approved {len(approved)} attendance requests:** {names}"[:2000])
+
     @commands.command()
     async def deployment_log(self, ctx):
         """ Show deployment duration & attendance log """
-        if not self.DeploymentStartTime:
-            await ctx.send("❌ **No deployment activity to log.**")
-            return
+        deployment = self.deployment(ctx.guild.id)
+        if deployment.state != IDLE:
+            started_at, ended_at, attendance = deployment.started_at, deployment.ended_at, deployment.attendance
+        else:  # Nothing since the last restart; show the latest deployment from the history
+            latest = await self.store.latest(ctx.guild.id)
+            if latest is None:
+                await ctx.send("❌ **No deployment activity to log.**")
+                return
+            started_at, ended_at, attendance = latest
 
-        elapsed_time = int(time.time() - self.DeploymentStartTime)
+        elapsed_time = int((ended_at or time.time()) - started_at)
         hours, minutes = divmod(elapsed_time // 60, 60)
 
-        attendees = ", ".join(self.DeploymentAttendance) if self.DeploymentAttendance else "No attendees"
+        attendees = ", ".join(f"<@{member_id}>" for member_id in attendance) if attendance else "No attendees"
 
         await ctx.send(f"📜 **Deployment Log**\n🕒 Duration: **{hours}h {minutes}m**\n👥 Attendees: {attendees}")
 
     #Slash Commands
 
+    @discord.app_commands.command(name="deployment_stats", description="Deployments per week, top attendees and attendance rates")
+    @discord.app_commands.describe(since="First day (YYYY-MM-DD), default 12 weeks ago", until="Last day (YYYY-MM-DD), default today",
+                                   member="Show this member's attendance rate")
+    async def slash_deployment_stats(self, interaction: discord.Interaction, since: str = None, until: str = None,
+                                     member: discord.Member = None):
+        """ Reads the weekly rollups, so any range costs one row per week (or per member-week) """
+        try:
+            last_week = week_of(self.parse_day(until)) if until else week_of(time.time())
+            first_week = week_of(self.parse_day(since)) if since else last_week - STATS_DEFAULT_WEEKS + 1
+        except ValueError:
+            await interaction.response.send_message("⚠️ Dates must look like `2025-01-31`.", ephemeral=True)
+            return
+        if first_week > last_week:
+            await interaction.response.send_message("⚠️ `since` must be before `until`.", ephemeral=True)
+            return
+
+        guild_id = interaction.guild.id
+        weekly = await self.store.weekly(guild_id, first_week, last_week)
+        total = sum(count for _, count in weekly)
+        top = await self.store.top_attendees(guild_id, first_week, last_week, STATS_TOP_ATTENDEES)
+
+        def day(week):
+            return datetime.datetime.fromtimestamp(week_start(week), datetime.timezone.utc).strftime("%Y-%m-%d")
+
+        embed = discord.Embed(
+            title="📊 Deployment Stats",
+            description=f"Weeks of **{day(first_week)}** to **{day(last_week)}** · **{total}** deployments",
+            color=discord.Color.blue()
+        )
+        if member is not None:
+            attended = await self.store.member_attended(guild_id, member.id, first_week, last_week)
+            rate = f"{attended / total:.0%}" if total else "n/a"
+            embed.add_field(name=f"👤 {member.display_name}", value=f"Attended **{attended}/{total}** ({rate})", inline=False)
+        if top:
+            lines = [
+                f"**{place}.** <@{user_id}> — {attended} ({attended / total:.0%})" if total else f"**{place}.** <@{user_id}> — {attended}"
+                for place, (user_id, attended) in enumerate(top, start=1)
+            ]
+            embed.add_field(name="🏅 Top Attendees", value="\n".join(lines), inline=False)
+        if weekly:
+            lines = [f"{day(week)}: {count}" for week, count in weekly[-STATS_DEFAULT_WEEKS:]]
+            embed.add_field(name="📅 Deployments per Week", value="\n".join(lines), inline=False)
+        await interaction.response.send_message(embed=embed)
+
+    @staticmethod
+    def parse_day(text):
+        """ Parses YYYY-MM-DD as midnight UTC; raises ValueError otherwise """
+        return datetime.datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    @discord.app_commands.command(name="deployment_award", description="Award XP to every recorded deployment attendee - Slash Command")
+    @discord.app_commands.autocomplete(system_name=system_name_autocomplete)
+    @checks.app_deployment_perms()
+    async def slash_deployment_award(self, interaction: discord.Interaction, xp_amount: int, system_name: str = None):
+        """ Awards XP to all attendees in a single database round trip """
+        xp_cog = self.bot.get_cog("XPSystem")
+        if xp_cog is None:
+            await interaction.response.send_message("⚠️ The XP system is not loaded.", ephemeral=True)
+            return
+
+        max_xp = guild_config.guild(interaction.guild.id).deployment_setting("max_xp_limit")
+        if xp_amount <= 0 or (max_xp is not None and xp_amount > max_xp):
+            await interaction.response.send_message(f"⚠️ XP amount must be between 1 and {max_xp}.", ephemeral=True)
+            return
+        deployment = self.deployment(interaction.guild.id)
+        if deployment.state != ENDED:
+            await interaction.response.send_message("⚠️ XP can only be awarded once the deployment has ended.", ephemeral=True)
+            return
+        if not deployment.attendance:
+            await interaction.response.send_message("❌ **No recorded attendees to award.**", ephemeral=True)
+            return
+        if deployment.attendance <= deployment.awarded:
+            await interaction.response.send_message("⚠️ XP has already been awarded to every attendee of this deployment.", ephemeral=True)
+            return
+
+        system_name = await xp_cog.check_system(interaction, system_name)
+        if system_name is None:
+            return
+        async with deployment.lock:
+            # Late approvals can join the attendance after an award; pay only the members not yet paid
+            attendees = sorted(deployment.attendance - deployment.awarded)
+            if not attendees:
+                await interaction.response.send_message("⚠️ XP has already been awarded to every attendee of this deployment.", ephemeral=True)
+                return
+            awarded = await xp_cog.award_many(
+                interaction.guild.id, attendees, system_name, xp_amount,
+                actor_id=interaction.user.id, reason="Deployment attendance"
+            )
+            deployment.awarded.update(attendees)
+
+        embed = discord.Embed(
+            title="🎖️ Deployment XP Awarded",
+            description=f"**{awarded}** attendees received **{xp_amount}** XP in `{system_name}`.",
+            color=discord.Color.green()
+        )
+        mentions = ", ".join(f"<@{member_id}>" for member_id in attendees)
+        embed.add_field(name="👥 Attendees", value=mentions if len(mentions) <= 1024 else f"{awarded} members", inline=False)
+        await interaction.response.send_message(embed=embed)
+
+    @discord.app_commands.command(name="deployment_voice", description="Choose which voice channels count toward attendance and for how long")
+    @checks.app_deployment_perms()
+    async def slash_deployment_voice(self, interaction: discord.Interaction, channel: discord.VoiceChannel = None,
+                                     min_minutes: discord.app_commands.Range[int, 0, 1440] = None):
+        """ Toggles a tracked voice channel and/or sets the minimum minutes; takes effect from the next deployment """
+        settings = guild_config.edit(interaction.guild.id).setdefault("deployment_settings", {})
+        if channel is not None:
+            channel_ids = settings.setdefault("voice_channels", [])
+            if channel.id in channel_ids:
+                channel_ids.remove(channel.id)
+            else:
+                channel_ids.append(channel.id)
+        if min_minutes is not None:
+            settings["min_voice_minutes"] = min_minutes
+
+        config = guild_config.guild(interaction.guild.id)
+        channel_ids = config.deployment_setting("voice_channels")
+        tracked = ", ".join(f"<#{channel_id}>" for channel_id in channel_ids) if channel_ids else "every voice channel"
+        await interaction.response.send_message(
+            f"🎧 Tracking {tracked}; members need **{config.deployment_setting('min_voice_minutes')}** minutes to be registered.",
+            ephemeral=True
+        )
+
     @discord.app_commands.command(name="deployment_start", description="Start a deployment and send an announcement - Slash Command")
+    @checks.app_deployment_perms()
     async def slash_deployment_start(self, interaction: discord.Interaction):
         """ Start a deployment using a Slash Command """
-        await self.deployment_start(interaction)
-        await interaction.response.send_message("✅ **Deployment has started!**", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_start)
         
     @discord.app_commands.command(name="deployment_end", description="End deployment with a countdown - Slash Command")
+    @checks.app_deployment_perms()
     async def slash_deployment_end(self, interaction: discord.Interaction):
         """ End deployment with a countdown - Slash Command """
-        await self.deployment_end(interaction)
-        await interaction.response.send_message("❌ **Deployment has ended!** Commands are now disabled.", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_end)
         
     @discord.app_commands.command(name="deployment_status", description="Check deployment status & countdown time for XP registration - Slash Command")
     async def slash_deployment_status(self, interaction: discord.Interaction):
         """ Check deployment status using a Slash Command """
-        await self.deployment_status(interaction)
-        await interaction.response.send_message("📢 **Deployment status checked!**", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_status)
         
     @discord.app_commands.command(name="deployment_extend", description="Extend deployment duration dynamically - Slash Command")
+    @checks.app_deployment_perms()
     async def slash_deployment_extend(self, interaction: discord.Interaction, extra_minutes: int):
         """ Extend deployment duration using a Slash Command """
-        await self.deployment_extend(interaction, extra_minutes)
-        await interaction.response.send_message(f"⏳ **Deployment extended by {extra_minutes} minutes!**", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_extend, extra_minutes=extra_minutes)
         
     @discord.app_commands.command(name="deployment_cancel", description="Immediately cancel deployment - Slash Command")
+    @checks.app_deployment_perms()
     async def slash_deployment_cancel(self, interaction: discord.Interaction):
         """ Immediately cancel deployment using a Slash Command """
-        await self.deployment_cancel(interaction)
-        await interaction.response.send_message("❌ **Deployment has been force-ended!** All related commands are now disabled.", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_cancel)
     
     @discord.app_commands.command(name="deployment_attend", description="Register deployment attendance - Slash Command")
     async def slash_deployment_attend(self, interaction: discord.Interaction):
         """ Register deployment attendance using a Slash Command """
-        await self.deployment_attend(interaction)
-        await interaction.response.send_message("📢 **Attendance request sent! React with 👍 to confirm.**", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_attend)
+    
+    @discord.app_commands.command(name="deployment_approve_all", description="Approve every pending attendance request - Slash Command")
+    @checks.app_deployment_perms()
+    async def slash_deployment_approve_all(self, interaction: discord.Interaction):
+        """ Approve every pending attendance request using a Slash Command """
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_approve_all)
     
     @discord.app_commands.command(name="deployment_log", description="Show deployment duration & attendance log - Slash Command")
     async def slash_deployment_log(self, interaction: discord.Interaction):
         """ Show deployment duration & attendance log using a Slash Command """
-        await self.deployment_log(interaction)
-        await interaction.response.send_message("📜 **Deployment log requested!**", ephemeral=True)
+        ctx = await commands.Context.from_interaction(interaction)
+        await ctx.invoke(self.deployment_log)
     
 async def setup(bot):
     await bot.add_cog(Deployments(bot))
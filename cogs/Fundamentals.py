@@ -1,28 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 
-SERVER_INFO_FILE = os.path.expanduser("~/SovereignBot/Server_info.json")
-
-def load_server_info():
-    """ Loads server configuration from JSON file """
-    if os.path.exists(SERVER_INFO_FILE):
-        with open(SERVER_INFO_FILE, "r") as file:
-            return json.load(file)
-    return {}
-
-def get_server_setting(guild_id, setting, default=None):
-    """ Safely retrieves a configuration setting for the guild """
-    server_info = load_server_info()
-    guild_data = server_info.get(str(guild_id), {})
-
-    # Debugging: Print what’s actually being found
-    print(f"🔍 Searching JSON for server {guild_id}")
-    print(f"🔍 Retrieved Data: {guild_data}")
-
-    return guild_data.get(setting, default)
+from cogs.utils import checks
 
 class Fundamentals(commands.Cog):
     """ Handles essential bot permissions and admin utilities """
@@ -30,15 +10,18 @@ class Fundamentals(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def has_mod_perms(self, ctx):
-        """ Checks if user has mod permissions dynamically """
-        mod_roles = get_server_setting(ctx.guild.id, "roles").get("mod_perms", [])
-        return any(discord.utils.get(ctx.author.roles, name=role) for role in mod_roles) or ctx.author.guild_permissions.administrator
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        checks.permissions.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            checks.permissions.invalidate(after.guild.id)
 
-    def has_xp_perms(self, ctx):
-        """ Checks if user has XP permissions dynamically """
-        xp_roles = get_server_setting(ctx.guild.id, "roles").get("xp_perms", [])
-        return any(discord.utils.get(ctx.author.roles, name=role) for role in xp_roles)
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        checks.permissions.invalidate(role.guild.id)
 
     @commands.command(name="update_tree")
     async def update_tree(self, ctx):
@@ -1,28 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 
-SERVER_INFO_FILE = os.path.expanduser("~/SovereignBot/Server_info.json")
-
-def load_server_info():
-    """ Loads server configuration from JSON file """
-    if os.path.exists(SERVER_INFO_FILE):
-        with open(SERVER_INFO_FILE, "r") as file:
-            return json.load(file)
-    return {}
-
-def get_server_setting(guild_id, setting, default=None):
-    """ Safely retrieves a configuration setting for the guild """
-    server_info = load_server_info()
-    guild_data = server_info.get(str(guild_id), {})
-
-    # Debugging: Print what’s actually being found
-    print(f"🔍 Searching JSON for server {guild_id}")
-    print(f"🔍 Retrieved Data: {guild_data}")
-
-    return guild_data.get(setting, default)
+from cogs.utils.config import guild_config
 
 class ServerInfo(commands.Cog):
     """ Displays server configuration details """
@@ -34,10 +14,11 @@ class ServerInfo(commands.Cog):
     async def server_info(self, ctx):
         """ Displays the server's full name, abbreviation, and key settings (Prefix Command) """
         guild_id = ctx.guild.id
-        server_name = get_server_setting(guild_id, "server_name")
-        abbreviation = get_server_setting(guild_id, "abbreviation")
-        channels = get_server_setting(guild_id, "channels")
-        roles = get_server_setting(guild_id, "roles")
+        config = guild_config.guild(guild_id)
+        server_name = config.server_name
+        abbreviation = config.abbreviation
+        channels = config.channels
+        roles = config.roles
 
         if not server_name:
             await ctx.send("⚠️ Server information not found in the configuration file.")
@@ -4,10 +4,18 @@ from discord import app_commands
 import asyncio
 import json
 import os
-import datetime
+import time
+
+from cogs.utils import checks
+from cogs.utils.ballots import MAX_OPTIONS, MAX_RANKS, VOTE_KINDS, YES_NO_OPTIONS, encode_ranking, make_tally, role_weights
+from cogs.utils.config import guild_config
+from cogs.utils.vote_store import VoteStore
 
 VOTE_ROLES_FILE = os.path.expanduser("~/SovereignBot/vote_roles.json")
-DOUBLE_VOTE_FILE = os.path.expanduser("~/SovereignBot/DoubleVoteRoles.json")
+VOTE_RENDER_INTERVAL = float(os.getenv("VOTE_RENDER_INTERVAL", "2"))  # Min seconds between live tally edits
+VOTE_DURATION = 3 * 24 * 60 * 60
+RESULTS_MAX_CHARS = 3000  # Leaves room in the 4096-character embed for the topic and outcome
+RANK_LABELS = ("1st", "2nd", "3rd", "4th")
 
 def load_vote_roles():
     """Loads allowed voting roles from file."""
@@ -21,128 +29,403 @@ def save_vote_roles(role_ids):
     with open(VOTE_ROLES_FILE, "w") as file:
         json.dump(role_ids, file, indent=4)
 
-def load_double_vote_roles():
-    """Loads roles that grant double voting power."""
-    if os.path.exists(DOUBLE_VOTE_FILE):
-        with open(DOUBLE_VOTE_FILE, "r") as file:
-            return json.load(file)
-    return []
+def parse_options(text: str) -> list:
+    """Splits a comma- or semicolon-separated option list, dropping blanks."""
+    separator = ";" if ";" in text else ","
+    return [option.strip() for option in text.split(separator) if option.strip()]
+
+class ChoiceSelect(discord.ui.Select):
+    """Plurality ballot: one pick from the vote's options."""
+
+    def __init__(self, vote_view, options: list):
+        super().__init__(
+            custom_id=f"vote:{vote_view.vote_id}:choice",
+            placeholder="Choose an option",
+            options=[discord.SelectOption(label=option, value=str(index)) for index, option in enumerate(options)]
+        )
+        self.vote_view = vote_view
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        await self.vote_view.cast(interaction, encode_ranking([int(self.values[0])]))
+
+class RankButton(discord.ui.Button):
+    """Opens a private ranked ballot for the clicking member."""
+
+    def __init__(self, vote_view):
+        super().__init__(label="Rank the options 🗳", style=discord.ButtonStyle.primary, custom_id=f"vote:{vote_view.vote_id}:rank")
+        self.vote_view = vote_view
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        view = self.vote_view
+        if not await view.ensure_loaded():
+            await interaction.response.send_message("⚠️ This vote is no longer open.", ephemeral=True)
+            return
+        if interaction.user.id in view.user_votes:
+            await interaction.response.send_message("⚠️ You have already voted in this poll.", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            "Rank the options, most preferred first, then press **Submit**.", view=RankedBallotView(view), ephemeral=True
+        )
+
+class RankedBallotView(discord.ui.View):
+    """An ephemeral ballot with one select per rank; nothing is recorded until Submit."""
+
+    def __init__(self, vote_view):
+        super().__init__(timeout=300)
+        self.vote_view = vote_view
+        options = vote_view.tally.options
+        self.picks = [None] * min(MAX_RANKS, len(options))
+        for rank in range(len(self.picks)):
+            select = discord.ui.Select(
+                placeholder=f"{RANK_LABELS[rank]} choice" + ("" if rank == 0 else " (optional)"),
+                min_values=0,
+                options=[discord.SelectOption(label=option, value=str(index)) for index, option in enumerate(options)],
+                row=rank
+            )
+            select.callback = self._picker(rank, select)
+            self.add_item(select)
+
+    def _picker(self, rank: int, select: discord.ui.Select):
+        async def pick(interaction: discord.Interaction) -> None:
+            self.picks[rank] = int(select.values[0]) if select.values else None
+            await interaction.response.defer()
+        return pick
+
+    @discord.ui.button(label="Submit", style=discord.ButtonStyle.success, row=4)
+    async def submit(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if None in self.picks:
+            filled = self.picks[:self.picks.index(None)]
+            if any(pick is not None for pick in self.picks[len(filled):]):
+                await interaction.response.send_message("⚠️ Fill your choices in order, without gaps.", ephemeral=True)
+                return
+        else:
+            filled = self.picks
+        if not filled:
+            await interaction.response.send_message("⚠️ Pick at least your 1st choice.", ephemeral=True)
+            return
+        if len(set(filled)) != len(filled):
+            await interaction.response.send_message("⚠️ Each option can only be ranked once.", ephemeral=True)
+            return
+        self.stop()
+        await self.vote_view.cast(interaction, encode_ranking(filled), edit=True)
 
 class VoteView(discord.ui.View):
-    """Handles anonymous voting via Discord buttons with a single-vote restriction."""
+    """Handles anonymous voting via Discord components with a single-vote restriction.
+
+    Yes/no votes use Aye/Nay/Abstain buttons, plurality votes a select menu and
+    ranked votes a button that opens a private ballot. Component custom_ids
+    carry the vote ID, so a view re-registered with ``bot.add_view`` after a
+    restart routes interactions back to the right vote. Its question, tally
+    and voters are loaded from the vote store on first use.
+    """
 
-    def __init__(self, vote_id: int, question: str, required_votes: int, max_votes: int, cog):
+    def __init__(self, vote_id: int, cog, kind: str = "yesno", options=YES_NO_OPTIONS, record=None):
         super().__init__(timeout=None)  # Prevents buttons from disappearing
         self.vote_id = vote_id
-        self.question = question
-        self.required_votes = required_votes
-        self.max_votes = max_votes
         self.cog = cog
-        self.votes = {"Aye": 0, "Nay": 0, "Abstain": 0}
+        self.kind = kind
+        if kind == "yesno":
+            self.aye_button.custom_id = f"vote:{vote_id}:Aye"
+            self.nay_button.custom_id = f"vote:{vote_id}:Nay"
+            self.abstain_button.custom_id = f"vote:{vote_id}:Abstain"
+        else:
+            self.clear_items()
+            self.add_item(ChoiceSelect(self, options) if kind == "plurality" else RankButton(self))
+        self.question = None
+        self.required_votes = None
+        self.max_votes = None
+        self.end_time = None
+        self.tally = make_tally(kind, options)
         self.user_votes = set()  # Track users who have already voted
-        self.double_vote_roles = set(load_double_vote_roles())
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+        if record is not None:
+            self._apply(record)
+        self.render_interval = VOTE_RENDER_INTERVAL
+        self._dirty = False  # Tally changed since the last edit
+        self._last_render = 0.0
+        self._render_task = None
+
+    def _apply(self, record) -> None:
+        self.question = record.question
+        self.required_votes = record.required_votes
+        self.max_votes = record.max_votes
+        self.end_time = record.end_time
+        self.tally = make_tally(record.kind, record.options)
+        for ranking, weight in record.ballots:
+            self.tally.add(ranking, weight)
+        self.user_votes = set(record.voters)
+        self.loaded = True
+
+    async def ensure_loaded(self) -> bool:
+        """Rehydrates the vote from the store the first time it's needed; False if it's closed or gone."""
+        if not self.loaded:
+            async with self._load_lock:
+                if not self.loaded:
+                    record = await self.cog.store.load(self.vote_id)
+                    if record is None or record.closed:
+                        return False
+                    self._apply(record)
+        return True
+
+    def tally_embed(self) -> discord.Embed:
+        """Builds the live tally embed from the in-memory counts."""
+        return discord.Embed(
+            title=f"🗳 **Vote #{self.vote_id} Ongoing**",
+            description=f"**Topic:** {self.question}\n\nCurrent tally:\n" + "\n".join(self.tally.live_lines()),
+            color=discord.Color.blue()
+        )
+
+    def schedule_render(self) -> None:
+        """Marks the tally dirty; one render task pushes at most one edit per interval."""
+        self._dirty = True
+        if self._render_task is None or self._render_task.done():
+            self._render_task = asyncio.create_task(self._render_loop())
+
+    async def _render_loop(self) -> None:
+        while self._dirty:
+            delay = self._last_render + self.render_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)  # Votes arriving meanwhile are picked up by this edit
+            await self._render()
+
+    async def _render(self) -> None:
+        self._dirty = False
+        self._last_render = time.monotonic()
+        vote_data = self.cog.active_votes.get(self.vote_id)
+        if vote_data is None or vote_data["message"] is None:
+            return
+        try:
+            await vote_data["message"].edit(embed=self.tally_embed(), view=self)
+        except discord.HTTPException as e:
+            print(f"⚠️ Couldn't update tally for vote #{self.vote_id}: {e}")
+
+    async def flush_render(self, final: bool = False) -> None:
+        """Stops the render task, pushing the latest tally now unless the vote is being closed."""
+        if self._render_task is not None and not self._render_task.done():
+            self._render_task.cancel()
+        self._render_task = None
+        if self._dirty and not final:
+            await self._render()
+        self._dirty = False
+
+    def outcome(self) -> tuple:
+        """Returns (quorum met, result lines, outcome line); quorum and max_votes count voters, not weighted votes."""
+        voters = len(self.user_votes)
+        lines, verdict = self.tally.results()
+        if voters < self.required_votes:
+            return False, lines, f"⚠️ **No decision** — quorum not met ({voters}/{self.required_votes} voters)"
+        return True, lines, f"{verdict} — quorum met ({voters}/{self.required_votes} voters)"
 
     async def end_vote(self, timeout=False) -> None:
         """Ends the vote and sends results."""
-        if self.vote_id not in self.cog.active_votes:
+        vote_data = self.cog.active_votes.pop(self.vote_id, None)  # Claimed first, so the deadline and max_votes can't both close it
+        if vote_data is None:
             print(f"⚠️ Error: Vote ID {self.vote_id} not found in active_votes")
             return  # Prevents KeyError
 
-        vote_data = self.cog.active_votes[self.vote_id]
+        await self.flush_render(final=True)  # The results embed below supersedes any pending tally edit
+        self.stop()
+        if not await self.ensure_loaded():
+            return
         message = vote_data["message"]
 
-        result_text = "⏳ **Vote ended due to timeout**" if timeout else "✅ **Vote concluded successfully**"
-        color = discord.Color.red() if timeout else discord.Color.green()
+        result_text = "⏳ **Vote ended: deadline reached**" if timeout else "✅ **Vote closed: maximum votes reached**"
+        quorum_met, lines, outcome = self.outcome()
+        color = discord.Color.green() if quorum_met else discord.Color.red()
+        results = "\n".join(lines)
+        if len(results) > RESULTS_MAX_CHARS:  # Long runoffs keep their earliest rounds
+            results = results[:RESULTS_MAX_CHARS].rsplit("\n", 1)[0] + "\n…"
 
         embed = discord.Embed(
             title=f"🗳 **Vote #{self.vote_id} Ended**",
-            description=f"**Topic:** {self.question}\n\n✅ **Final Results:**\n👍 Aye: {self.votes['Aye']}\n👎 Nay: {self.votes['Nay']}\n🟡 Abstain: {self.votes['Abstain']}",
+            description=f"**Topic:** {self.question}\n{result_text}\n\n✅ **Final Results:**\n{results}\n\n{outcome}",
             color=color
         )
 
-        await message.edit(embed=embed, view=None)
-        del self.cog.active_votes[self.vote_id]  # Remove vote after completion
+        await self.cog.store.mark_closed(self.vote_id)
+        if not timeout:
+            await self.cog.bot.scheduler.cancel_matching("vote_deadline", vote_id=self.vote_id)
+        if message is not None:
+            await message.edit(embed=embed, view=None)
 
-    async def handle_vote(self, interaction: discord.Interaction, vote_type: str) -> None:
-        """Handles vote button clicks with single vote restriction and updates tally dynamically."""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Remembers the vote message from the first interaction after a restart that couldn't resolve it."""
+        vote_data = self.cog.active_votes.get(self.vote_id)
+        if vote_data is not None and vote_data["message"] is None:
+            vote_data["message"] = interaction.message
+        return True
+
+    async def _reply(self, interaction: discord.Interaction, text: str, edit: bool) -> None:
+        """Answers a deferred interaction."""
+        if edit:  # Replaces the private ranked ballot
+            await interaction.edit_original_response(content=text, view=None)
+        else:
+            await interaction.followup.send(text, ephemeral=True)
+
+    async def cast(self, interaction: discord.Interaction, ranking: bytes, edit: bool = False) -> None:
+        """Acknowledges the interaction right away, then records the ballot; the tally message is re-rendered in the background."""
+        # Deferred before any store access, which goes through a worker thread and can outlast Discord's 3-second window
+        if edit:
+            await interaction.response.defer()
+        else:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await self.ensure_loaded():
+            await self._reply(interaction, "⚠️ This vote is no longer open.", edit)
+            return
         if interaction.user.id in self.user_votes:
-            await interaction.response.send_message("⚠️ You have already voted in this poll.", ephemeral=True)
+            await self._reply(interaction, "⚠️ You have already voted in this poll.", edit)
             return  # Stops the user from voting twice
 
-        multiplier = 2 if any(role.id in self.double_vote_roles for role in interaction.user.roles) else 1
-        self.votes[vote_type] += multiplier
+        weight = role_weights.weight(interaction.user)
+        label = self.tally.label(ranking)
         self.user_votes.add(interaction.user.id)  # Store user ID to prevent multi-voting
+        try:
+            # One appended row per ballot; the (vote, user) key rejects repeats that raced us
+            recorded = await self.cog.store.add_ballot(self.vote_id, interaction.user.id, self.tally.options[ranking[0]], weight, ranking)
+        except Exception:
+            self.user_votes.discard(interaction.user.id)
+            await self._reply(interaction, "⚠️ Your vote couldn't be recorded. Please try again.", edit)
+            raise
+        if not recorded:
+            await self._reply(interaction, "⚠️ You have already voted in this poll.", edit)
+            return
+        self.tally.add(ranking, weight)
 
-        # Update embed with live vote tally
-        embed = discord.Embed(
-            title=f"🗳 **Vote #{self.vote_id} Ongoing**",
-            description=f"**Topic:** {self.question}\n\nCurrent tally:\n"
-                        f"👍 Aye: {self.votes['Aye']}\n"
-                        f"👎 Nay: {self.votes['Nay']}\n"
-                        f"🟡 Abstain: {self.votes['Abstain']}",
-            color=discord.Color.blue()
-        )
-
-        vote_data = self.cog.active_votes.get(self.vote_id)
-        if vote_data:
-            await vote_data["message"].edit(embed=embed, view=self)  # Force update on vote message with buttons intact
-
-        await interaction.response.send_message(f"✅ You voted **{vote_type}** anonymously!", ephemeral=True)
+        if len(self.user_votes) >= self.max_votes:
+            await self._reply(interaction, f"✅ You voted **{label}** anonymously! That was the final vote.", edit)
+            await self.end_vote()
+            return
+        self.schedule_render()
+        await self._reply(interaction, f"✅ You voted **{label}** anonymously!", edit)
 
     @discord.ui.button(label="Aye 👍", style=discord.ButtonStyle.success)
     async def aye_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await self.handle_vote(interaction, "Aye")
+        await self.cast(interaction, encode_ranking([0]))
 
     @discord.ui.button(label="Nay 👎", style=discord.ButtonStyle.danger)
     async def nay_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await self.handle_vote(interaction, "Nay")
+        await self.cast(interaction, encode_ranking([1]))
 
     @discord.ui.button(label="Abstain 🟡", style=discord.ButtonStyle.secondary)
     async def abstain_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await self.handle_vote(interaction, "Abstain")
+        await self.cast(interaction, encode_ranking([2]))
 
 class Vote(commands.Cog):
     """Handles automated anonymous voting systems with button-based functionality."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.active_votes = {}  # Tracks ongoing votes
+        self.store = VoteStore()
+        self.active_votes = {}  # vote_id -> {"view": VoteView, "message": message or None}
+
+    async def cog_load(self) -> None:
+        """Re-registers every open vote's buttons; their state is loaded on first click."""
+        deadlines = {}
+        for vote_id, channel_id, message_id, end_time, kind, options in await self.store.open_votes():
+            view = VoteView(vote_id, self, kind, options)
+            self.bot.add_view(view, message_id=message_id)
+            channel = self.bot.get_channel(channel_id)
+            message = channel.get_partial_message(message_id) if channel is not None else None
+            self.active_votes[vote_id] = {"view": view, "message": message}
+            deadlines[vote_id] = end_time
+        if self.active_votes:
+            print(f"🗳 Restored {len(self.active_votes)} open votes.")
+            asyncio.create_task(self.ensure_deadlines(deadlines))
+
+    async def ensure_deadlines(self, deadlines: dict) -> None:
+        """Schedules a deadline timer for any open vote that doesn't have one (e.g. votes from before timers)."""
+        await self.bot.scheduler.wait_started()
+        for vote_id, end_time in deadlines.items():
+            if not self.bot.scheduler.find("vote_deadline", vote_id=vote_id):
+                await self.bot.scheduler.create("vote_deadline", max(0, end_time - time.time()), vote_id=vote_id)
+
+    @commands.Cog.listener()
+    async def on_vote_deadline_timer_complete(self, timer) -> None:
+        """Closes a vote once its end time passes."""
+        vote_data = self.active_votes.get(timer.payload["vote_id"])
+        if vote_data is not None:
+            await vote_data["view"].end_vote(timeout=True)
+
+    async def cog_unload(self) -> None:
+        """Pushes any tally that hasn't been rendered yet."""
+        for vote_data in list(self.active_votes.values()):
+            await vote_data["view"].flush_render()
+            vote_data["view"].stop()
+        await self.store.close()
 
     async def check_permissions(self, interaction: discord.Interaction) -> bool:
         """Checks if user has permission to start a vote."""
         allowed_roles = set(load_vote_roles())
         if any(role.id in allowed_roles for role in interaction.user.roles):
             return True
-        await interaction.response.send_message("⚠️ You don't have permission to create votes.", ephemeral=True)
+        if interaction.response.is_done():
+            await interaction.followup.send("⚠️ You don't have permission to create votes.", ephemeral=True)
+        else:
+            await interaction.response.send_message("⚠️ You don't have permission to create votes.", ephemeral=True)
         return False
 
-    async def start_vote(self, channel: discord.TextChannel, required_votes: int, max_votes: int, question: str) -> None:
-        """Starts an anonymous vote with live tally updates."""
-        vote_id = len(self.active_votes) + 1  # Auto-generates a unique vote ID
+    async def start_vote(self, channel: discord.TextChannel, required_votes: int, max_votes: int, question: str,
+                         kind: str = "yesno", options: list = None) -> int:
+        """Starts an anonymous vote with live tally updates and returns its ID."""
+        vote_id = await self.store.create(
+            channel.guild.id, channel.id, question, required_votes, max_votes, time.time() + VOTE_DURATION,
+            kind, options if kind != "yesno" else None
+        )
 
+        prompt = {
+            "yesno": "Click a button below to vote anonymously!",
+            "plurality": "Pick an option below to vote anonymously!",
+            "ranked": "Click **Rank the options** to rank your choices anonymously!",
+        }[kind]
         embed = discord.Embed(
             title=f"🗳 **Vote #{vote_id} Started**",
-            description=f"**Topic:** {question}\n\nClick a button below to vote anonymously!",
+            description=f"**Topic:** {question}\n\n{prompt}",
             color=discord.Color.blue()
         )
 
-        view = VoteView(vote_id, question, required_votes, max_votes, self)
-        message = await channel.send(embed=embed, view=view)
+        record = await self.store.load(vote_id)
+        view = VoteView(vote_id, self, kind, record.options, record)
+        try:
+            message = await channel.send(embed=embed, view=view)
+        except discord.HTTPException:
+            await self.store.mark_closed(vote_id)
+            raise
+        await self.store.set_message(vote_id, message.id)
+        await self.bot.scheduler.create("vote_deadline", VOTE_DURATION, vote_id=vote_id)
 
-        self.active_votes[vote_id] = {  # Use vote_id as key instead of message.id
-            "question": question,
-            "required_votes": required_votes,
-            "max_votes": max_votes,
-            "message": message,
-            "view": view,
-            "end_time": datetime.datetime.utcnow() + datetime.timedelta(days=3)
-        }
+        self.active_votes[vote_id] = {"view": view, "message": message}
+        return vote_id
 
     @app_commands.command(name="create_vote", description="Starts an anonymous vote using buttons")
-    async def create_vote_slash(self, interaction: discord.Interaction, channel: discord.TextChannel, required_votes: int, max_votes: int, question: str) -> None:
+    @app_commands.describe(kind="yesno (Aye/Nay/Abstain), plurality or ranked (instant runoff)",
+                           options="Plurality/ranked options, separated by commas or semicolons")
+    @app_commands.choices(kind=[app_commands.Choice(name=kind, value=kind) for kind in VOTE_KINDS])
+    async def create_vote_slash(self, interaction: discord.Interaction, channel: discord.TextChannel, required_votes: int, max_votes: int,
+                                question: str, kind: str = "yesno", options: str = None) -> None:
         """Slash command version: Starts an anonymous vote"""
-        if await self.check_permissions(interaction):
-            await self.start_vote(channel, required_votes, max_votes, question)
+        # Creating the vote takes several store writes, a send and a timer; acknowledge within Discord's deadline first
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await self.check_permissions(interaction):
+            return
+        choices = None
+        if kind != "yesno":
+            choices = parse_options(options or "")
+            if not 2 <= len(choices) <= MAX_OPTIONS:
+                await interaction.followup.send(f"⚠️ A {kind} vote needs between 2 and {MAX_OPTIONS} options.", ephemeral=True)
+                return
+            if len(set(choices)) != len(choices) or any(len(choice) > 100 for choice in choices):
+                await interaction.followup.send("⚠️ Options must be unique and at most 100 characters long.", ephemeral=True)
+                return
+        vote_id = await self.start_vote(channel, required_votes, max_votes, question, kind, choices)
+        await interaction.followup.send(f"✅ Vote #{vote_id} started in {channel.mention}.", ephemeral=True)
+
+    @app_commands.command(name="set_vote_weight", description="Sets how many votes a role's members cast")
+    @checks.app_mod_perms()
+    async def set_vote_weight(self, interaction: discord.Interaction, role: discord.Role, weight: app_commands.Range[int, 1, 100]) -> None:
+        # Stored even when 1, so it also overrides the legacy double-vote list
+        guild_config.edit(interaction.guild.id).setdefault("roles", {}).setdefault("vote_weights", {})[str(role.id)] = weight
+        await interaction.response.send_message(f"⚖️ Members of {role.mention} now cast **{weight}** vote(s).", ephemeral=True)
 
     @commands.command(name="create_vote")
     async def create_vote_text(self, ctx: commands.Context, channel: discord.TextChannel, required_votes: int, max_votes: int, *question: str) -> None:
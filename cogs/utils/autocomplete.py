@@ -0,0 +1,14 @@
+import discord
+
+
+async def system_name_autocomplete(interaction: discord.Interaction, current: str):
+    """ Suggests the guild's registered XP systems from the XPSystem cog's in-memory cache """
+    cog = interaction.client.get_cog("XPSystem")
+    if cog is None or interaction.guild is None:
+        return []
+    systems = await cog.guild_systems(interaction.guild.id)
+    current = current.lower()
+    return [
+        discord.app_commands.Choice(name=name, value=name)
+        for name in systems.names if current in name.lower()
+    ][:25]
@@ -0,0 +1,212 @@
+import json
+import os
+
+from cogs.utils.checks import resolve_role_entry, role_ids_by_name
+from cogs.utils.config import DATA_DIR, guild_config
+
+DOUBLE_VOTE_FILE = os.path.join(DATA_DIR, "DoubleVoteRoles.json")
+
+VOTE_KINDS = ("yesno", "plurality", "ranked")
+YES_NO_OPTIONS = ("Aye", "Nay", "Abstain")
+YES_NO_EMOJI = {"Aye": "👍", "Nay": "👎", "Abstain": "🟡"}
+MAX_OPTIONS = 25  # One select menu
+MAX_RANKS = 4  # Ranked ballots fill one select per rank, plus a row for Submit
+
+
+def encode_ranking(indices):
+    """ Packs option indices (most preferred first) into a compact byte string """
+    return bytes(indices)
+
+
+class RoleWeights:
+    """ Per-guild role ID -> ballot weight maps.
+
+    Weights come from ``roles.vote_weights`` in the guild config (role names or
+    IDs), with roles in the legacy DoubleVoteRoles.json counting double unless
+    configured. Each guild's map is built once and reused until its config
+    revision, role set or the legacy file changes. A member's weight is the
+    highest weight among their roles, or 1 if none of them are weighted.
+    """
+
+    def __init__(self, legacy_path=DOUBLE_VOTE_FILE):
+        self.legacy_path = legacy_path
+        self._legacy = (None, frozenset())  # (file mtime, role IDs)
+        self._maps = {}  # guild_id -> (cache key, {role_id: weight})
+
+    def _legacy_roles(self):
+        try:
+            mtime = os.path.getmtime(self.legacy_path)
+        except OSError:
+            return None, frozenset()
+        if self._legacy[0] != mtime:
+            with open(self.legacy_path, "r") as file:
+                self._legacy = (mtime, frozenset(int(role_id) for role_id in json.load(file)))
+        return self._legacy
+
+    def for_guild(self, guild):
+        legacy_mtime, legacy_roles = self._legacy_roles()
+        key = (guild_config.revision(guild.id), len(guild.roles), legacy_mtime)
+        cached = self._maps.get(guild.id)
+        if cached is None or cached[0] != key:
+            weights = dict.fromkeys((role_id for role_id in legacy_roles if guild.get_role(role_id)), 2)
+            ids_by_name = role_ids_by_name(guild)
+            for entry, weight in (guild_config.guild(guild.id).roles.get("vote_weights") or {}).items():
+                for role_id in resolve_role_entry(guild, entry, ids_by_name):
+                    weights[role_id] = int(weight)
+            cached = self._maps[guild.id] = (key, weights)
+        return cached[1]
+
+    def weight(self, member):
+        weights = self.for_guild(member.guild)
+        matched = [weights[role.id] for role in member.roles if role.id in weights]
+        return max(matched) if matched else 1
+
+
+role_weights = RoleWeights()
+
+
+class PluralityTally:
+    """ One weighted count per option; a ballot's first choice is its vote """
+
+    def __init__(self, options):
+        self.options = list(options)
+        self.counts = [0] * len(self.options)
+        self.ballots = 0
+
+    def add(self, ranking, weight):
+        self.counts[ranking[0]] += weight
+        self.ballots += 1
+
+    def label(self, ranking):
+        return self.options[ranking[0]]
+
+    def live_lines(self):
+        return [f"▫️ {option}: {count}" for option, count in zip(self.options, self.counts)]
+
+    def results(self):
+        """ (result lines, verdict line) for the closing embed """
+        return self.live_lines(), self.verdict()
+
+    def verdict(self):
+        best = max(self.counts, default=0)
+        leaders = [option for option, count in zip(self.options, self.counts) if count == best]
+        if len(leaders) != 1:
+            return f"⚖️ **Tied** between {', '.join(leaders)}"
+        return f"🏆 **{leaders[0]}** wins"
+
+
+class YesNoTally(PluralityTally):
+    """ The classic Aye/Nay/Abstain motion """
+
+    def __init__(self, options=YES_NO_OPTIONS):
+        super().__init__(YES_NO_OPTIONS)
+
+    def live_lines(self):
+        return [f"{YES_NO_EMOJI[option]} {option}: {count}" for option, count in zip(self.options, self.counts)]
+
+    def verdict(self):
+        aye, nay = self.counts[0], self.counts[1]
+        if aye > nay:
+            return "🏛 **Motion passed**"
+        if nay > aye:
+            return "🚫 **Motion failed**"
+        return "⚖️ **Tied**"
+
+
+class RankedTally:
+    """ Instant-runoff ballots.
+
+    Identical rankings are merged into one weighted group keyed by their
+    packed bytes, and first-preference counts are kept up to date as ballots
+    arrive, so the live tally is O(1) per ballot. ``runoff()`` runs at close:
+    each group sits in the bucket of its current top choice, and eliminating
+    an option only moves that option's bucket, so the work is bounded by
+    ballots x rounds.
+    """
+
+    def __init__(self, options):
+        self.options = list(options)
+        self.first = [0] * len(self.options)
+        self.groups = {}  # packed ranking -> summed weight
+        self.ballots = 0
+
+    def add(self, ranking, weight):
+        self.first[ranking[0]] += weight
+        self.groups[ranking] = self.groups.get(ranking, 0) + weight
+        self.ballots += 1
+
+    def label(self, ranking):
+        return " > ".join(self.options[index] for index in ranking)
+
+    def live_lines(self):
+        return [f"▫️ {option}: {count} first-choice" for option, count in zip(self.options, self.first)]
+
+    def runoff(self):
+        """ Returns (rounds, winner index or None); each round is ({option: count}, eliminated index or None).
+
+        There's no winner when no ballots count or when every remaining option is tied.
+        """
+        count = len(self.options)
+        counts = [0] * count
+        buckets = [[] for _ in range(count)]
+        position = {}
+        for ranking, weight in self.groups.items():
+            counts[ranking[0]] += weight
+            buckets[ranking[0]].append(ranking)
+            position[ranking] = 0
+
+        eliminated = [False] * count
+        rounds = []
+        while True:
+            active = [index for index in range(count) if not eliminated[index]]
+            total = sum(counts[index] for index in active)
+            snapshot = {index: counts[index] for index in active}
+            if total == 0:
+                rounds.append((snapshot, None))
+                return rounds, None
+            leader = max(active, key=lambda index: (counts[index], -index))
+            if counts[leader] * 2 > total or len(active) == 1:
+                rounds.append((snapshot, None))
+                return rounds, leader
+            if all(counts[index] == counts[leader] for index in active):
+                # Nothing separates them, so dropping one would decide the vote by listing order
+                rounds.append((snapshot, None))
+                return rounds, None
+
+            # Fewest votes goes; ties drop the option with fewer first preferences, then the later-listed one
+            loser = min(active, key=lambda index: (counts[index], self.first[index], -index))
+            eliminated[loser] = True
+            rounds.append((snapshot, loser))
+            for ranking in buckets[loser]:
+                step = position[ranking] + 1
+                while step < len(ranking) and eliminated[ranking[step]]:
+                    step += 1
+                position[ranking] = step
+                if step < len(ranking):  # Otherwise the ballot is exhausted
+                    counts[ranking[step]] += self.groups[ranking]
+                    buckets[ranking[step]].append(ranking)
+            buckets[loser] = []
+            counts[loser] = 0
+
+    def results(self):
+        rounds, winner = self.runoff()
+        lines = []
+        for number, (snapshot, loser) in enumerate(rounds, start=1):
+            standings = " · ".join(
+                f"{self.options[index]} {votes}" for index, votes in sorted(snapshot.items(), key=lambda item: -item[1])
+            )
+            suffix = f" → **{self.options[loser]}** eliminated" if loser is not None else ""
+            lines.append(f"Round {number}: {standings}{suffix}")
+        if winner is None:
+            tied = rounds[-1][0]
+            if not any(tied.values()):
+                return lines, "⚖️ **No winner** (no ballots)"
+            return lines, f"⚖️ **Tied** between {', '.join(self.options[index] for index in sorted(tied))}"
+        return lines, f"🏆 **{self.options[winner]}** wins"
+
+
+TALLIES = {"yesno": YesNoTally, "plurality": PluralityTally, "ranked": RankedTally}
+
+
+def make_tally(kind, options):
+    return TALLIES[kind](options)
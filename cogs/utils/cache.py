@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """ Bounded mapping whose entries expire ``ttl`` seconds after they were set.
+
+    Entries are kept in expiry order, so expired keys are evicted from the
+    front in O(1) each, and the oldest entry is dropped once ``maxsize`` is hit.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def _evict(self, now):
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        self._evict(now)
+        self._data.pop(key, None)
+        self._data[key] = (now + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def update_value(self, key, value):
+        """ Replaces the value for a live key without extending its expiry """
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data[key] = (entry[0], value)
+
+    def __len__(self):
+        self._evict(time.monotonic())
+        return len(self._data)
+
+    def items(self):
+        self._evict(time.monotonic())
+        return [(key, value) for key, (_, value) in self._data.items()]
+
+
+class LRUCache:
+    """ Bounded mapping that evicts the least recently used key once ``maxsize`` is hit """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,220 @@
+import os
+from collections import Counter
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from cogs.utils.cache import TTLCache
+from cogs.utils.config import guild_config
+
+BLACKLIST_NOTICE_COOLDOWN = float(os.getenv("BLACKLIST_NOTICE_COOLDOWN", "300"))
+
+CAPABILITIES = ("mod_perms", "deployment_perms", "xp_perms", "protected_roles")
+
+CAPABILITY_LABELS = {
+    "mod_perms": "Mod Perms",
+    "deployment_perms": "Deployment Perms",
+    "xp_perms": "XP Perms",
+}
+
+
+def role_ids_by_name(guild):
+    ids_by_name = {}
+    for role in guild.roles:
+        ids_by_name.setdefault(role.name, []).append(role.id)
+    return ids_by_name
+
+
+def resolve_role_entry(guild, entry, ids_by_name):
+    """ Resolves a configured role (an ID or a name) to the matching role IDs """
+    if isinstance(entry, int) or (isinstance(entry, str) and entry.isdigit()):
+        if guild.get_role(int(entry)) is not None:
+            return [int(entry)]
+    return ids_by_name.get(str(entry), [])
+
+
+class PermissionResolver:
+    """ Resolves configured capability roles to frozensets of role IDs per guild.
+
+    Config entries may be role names or role IDs. Each guild is compiled once
+    and reused until its config revision changes or a role event invalidates it,
+    so a check is a set intersection instead of a name scan per configured role.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._compiled = {}  # guild_id -> (config revision, {capability: frozenset})
+
+    def invalidate(self, guild_id=None):
+        if guild_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(guild_id, None)
+
+    def _compile(self, guild):
+        config = self.store.guild(guild.id)
+        ids_by_name = role_ids_by_name(guild)
+
+        compiled = {}
+        for capability in CAPABILITIES:
+            entries = config.protected_roles if capability == "protected_roles" else config.role_names(capability)
+            role_ids = set()
+            for entry in entries:
+                role_ids.update(resolve_role_entry(guild, entry, ids_by_name))
+            compiled[capability] = frozenset(role_ids)
+        return compiled
+
+    def role_ids(self, guild, capability):
+        """ Returns the frozenset of role IDs that grant ``capability`` in the guild """
+        revision = self.store.revision(guild.id)
+        cached = self._compiled.get(guild.id)
+        if cached is None or cached[0] != revision:
+            cached = self._compiled[guild.id] = (revision, self._compile(guild))
+        return cached[1].get(capability, frozenset())
+
+    def has(self, member, capability):
+        """ True if the member holds any role granting ``capability`` """
+        if not isinstance(member, discord.Member):
+            return False
+        role_ids = self.role_ids(member.guild, capability)
+        return bool(role_ids) and not role_ids.isdisjoint(role.id for role in member.roles)
+
+    def allowed(self, member, capability):
+        """ Capability check used by the decorators; server administrators always pass """
+        if isinstance(member, discord.Member) and member.guild_permissions.administrator:
+            return True
+        return self.has(member, capability)
+
+    def is_protected(self, member):
+        return self.has(member, "protected_roles")
+
+
+permissions = PermissionResolver(guild_config)
+
+
+class BlacklistIndex:
+    """ Per-guild frozensets of blacklisted user IDs, rebuilt when the guild's config changes """
+
+    def __init__(self, store):
+        self.store = store
+        self._users = {}  # guild_id -> (config revision, frozenset of user IDs)
+
+    def users(self, guild_id):
+        revision = self.store.revision(guild_id)
+        cached = self._users.get(guild_id)
+        if cached is None or cached[0] != revision:
+            user_ids = frozenset(int(user_id) for user_id in self.store.guild(guild_id).blacklist if str(user_id).isdigit())
+            cached = self._users[guild_id] = (revision, user_ids)
+        return cached[1]
+
+    def contains(self, guild_id, user_id):
+        return user_id in self.users(guild_id)
+
+
+blacklist = BlacklistIndex(guild_config)
+
+
+class NoticeCooldown:
+    """ Allows at most one notice per (guild, user) per window and counts the rest """
+
+    def __init__(self, window=BLACKLIST_NOTICE_COOLDOWN, maxsize=10000):
+        self._recent = TTLCache(maxsize=maxsize, ttl=window)  # (guild_id, user_id) -> suppressed this window
+        self.sent = Counter()  # guild_id -> notices sent
+        self.suppressed = Counter()  # guild_id -> notices dropped
+
+    def should_notify(self, guild_id, user_id):
+        key = (guild_id, user_id)
+        suppressed = self._recent.get(key)
+        if suppressed is None:
+            self._recent[key] = 0
+            self.sent[guild_id] += 1
+            return True
+
+        self._recent.update_value(key, suppressed + 1)
+        self.suppressed[guild_id] += 1
+        return False
+
+    def active(self, guild_id):
+        """ Returns (user_id, suppressed) for users currently inside their cooldown window """
+        return [(user_id, count) for (guild, user_id), count in self._recent.items() if guild == guild_id]
+
+
+blacklist_notices = NoticeCooldown()
+
+
+class Blacklisted(commands.CheckFailure):
+    """ Raised by the global command check when the invoking user is blacklisted """
+
+    def __init__(self, user):
+        self.user = user
+        super().__init__(f"⛔ **{user.display_name}, you are blacklisted from using this bot!**")
+
+
+def is_blacklisted(guild_id, user_id):
+    return blacklist.contains(guild_id, user_id)
+
+
+def not_blacklisted(ctx):
+    """ Global prefix command check; only runs for messages that invoke a command """
+    if ctx.guild is not None and is_blacklisted(ctx.guild.id, ctx.author.id):
+        raise Blacklisted(ctx.author)
+    return True
+
+
+class MissingCapability(commands.CheckFailure):
+    """ Raised by the prefix command checks; the message is sent to the user as-is """
+
+    def __init__(self, capability):
+        self.capability = capability
+        super().__init__(f"⛔ You need the **{CAPABILITY_LABELS.get(capability, capability)}** role to use this command.")
+
+
+class AppMissingCapability(app_commands.CheckFailure):
+    """ Raised by the slash command checks; the message is sent to the user as-is """
+
+    def __init__(self, capability):
+        self.capability = capability
+        super().__init__(f"⛔ You need the **{CAPABILITY_LABELS.get(capability, capability)}** role to use this command.")
+
+
+def has_capability(capability):
+    """ Prefix command check for a configured capability """
+    def predicate(ctx):
+        if ctx.guild is None or not permissions.allowed(ctx.author, capability):
+            raise MissingCapability(capability)
+        return True
+    return commands.check(predicate)
+
+
+def app_has_capability(capability):
+    """ Slash command check for a configured capability """
+    def predicate(interaction: discord.Interaction):
+        if interaction.guild is None or not permissions.allowed(interaction.user, capability):
+            raise AppMissingCapability(capability)
+        return True
+    return app_commands.check(predicate)
+
+
+def mod_perms():
+    return has_capability("mod_perms")
+
+
+def deployment_perms():
+    return has_capability("deployment_perms")
+
+
+def xp_perms():
+    return has_capability("xp_perms")
+
+
+def app_mod_perms():
+    return app_has_capability("mod_perms")
+
+
+def app_deployment_perms():
+    return app_has_capability("deployment_perms")
+
+
+def app_xp_perms():
+    return app_has_capability("xp_perms")
@@ -0,0 +1,476 @@
+import asyncio
+import copy
+import filecmp
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+DATA_DIR = os.path.expanduser(os.getenv("SOVEREIGN_DATA_DIR", "~/SovereignBot"))
+SERVER_INFO_FILE = os.path.join(DATA_DIR, "Server_info.json")
+GUILD_CONFIG_DB = os.path.join(DATA_DIR, "guild_config.db")
+GUILD_CONFIG_BACKEND = os.getenv("GUILD_CONFIG_BACKEND", "json").lower()
+CONFIG_FLUSH_INTERVAL = float(os.getenv("CONFIG_FLUSH_INTERVAL", "5"))
+
+DEFAULT_SERVER_CONFIG = {
+    "server_name": "New Server",
+    "abbreviation": "NS",
+    "channels": {
+        "attendance": None,
+        "deployment_announcement": None,
+        "promotion": None,
+        "demotion": None
+    },
+    "roles": {
+        "deployment_perms": "Deployment Perms",
+        "mod_perms": ["Mod Perms", "Admin", "Staff"],
+        "xp_perms": ["XP Perms"],
+        "xp_roles": {
+            "Guest": 0
+        }
+    },
+    "blacklist": [],
+    "deployment_settings": {
+        "max_xp_limit": 150,
+        "default_attendance_timeout": 300,
+        "default_end_countdown": 1800,
+        "voice_channels": [],  # Voice channel IDs that count toward attendance; empty tracks all
+        "min_voice_minutes": 30
+    },
+    "xp_data": {},
+    "protected_roles": []
+}
+
+
+class GuildConfig:
+    """ Read-only, typed view over a single guild's configuration """
+
+    __slots__ = ("guild_id", "data")
+
+    def __init__(self, guild_id, data):
+        self.guild_id = str(guild_id)
+        self.data = data
+
+    def get(self, setting, default=None):
+        return self.data.get(setting, default)
+
+    @property
+    def server_name(self):
+        return self.data.get("server_name")
+
+    @property
+    def abbreviation(self):
+        return self.data.get("abbreviation")
+
+    @property
+    def channels(self):
+        return self.data.get("channels") or {}
+
+    @property
+    def roles(self):
+        return self.data.get("roles") or {}
+
+    @property
+    def blacklist(self):
+        return self.data.get("blacklist") or []
+
+    @property
+    def protected_roles(self):
+        return self.data.get("protected_roles") or []
+
+    def channel(self, name):
+        """ Returns a configured channel ID as an int, or None if unset """
+        channel_id = self.channels.get(name)
+        return int(channel_id) if channel_id else None
+
+    def role_names(self, capability):
+        """ Returns the configured role names for a capability as a list (the default's if the guild never set it) """
+        roles = self.roles
+        names = roles[capability] if capability in roles else DEFAULT_SERVER_CONFIG["roles"].get(capability)
+        names = names or []
+        return [names] if isinstance(names, str) else list(names)
+
+    def deployment_setting(self, name, default=None):
+        settings = self.data.get("deployment_settings") or {}
+        if name in settings:
+            return settings[name]
+        return DEFAULT_SERVER_CONFIG["deployment_settings"].get(name, default)
+
+
+class ConfigError(Exception):
+    """ Raised when stored configuration exists but can't be read; nothing is written back over it """
+
+
+def write_atomic(path, text):
+    """ Writes text to a temp file next to ``path`` and swaps it in with os.replace """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class JsonConfigBackend:
+    """ Stores every guild in a single JSON document (fine for small installs).
+
+    Any write rewrites the whole file, so the store loads everything up front.
+    """
+
+    lazy = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load_all(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path, "r") as file:
+            text = file.read()
+        if not text.strip():
+            return {}
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            # Treating it as empty would let the next flush replace every guild with only the edited one
+            backup = self.path + ".bak"
+            if not os.path.exists(backup) or not filecmp.cmp(self.path, backup, shallow=False):
+                shutil.copy2(self.path, backup)
+            raise ConfigError(f"{self.path} is not valid JSON ({e}); fix it by hand (a copy is in {self.path}.bak)") from e
+
+        return {str(guild_id): guild for guild_id, guild in data.items() if isinstance(guild, dict)}
+
+    def load_guild(self, guild_id):
+        return self.load_all().get(str(guild_id))
+
+    def guild_ids(self):
+        return list(self.load_all())
+
+    def serialize(self, guilds, dirty):
+        """ Called on the event loop so the snapshot is consistent """
+        return json.dumps(guilds, separators=(",", ":"))
+
+    def write(self, payload):
+        write_atomic(self.path, payload)
+
+    def close(self):
+        pass
+
+
+class SQLiteConfigBackend:
+    """ Stores one row per guild in SQLite (WAL mode).
+
+    Guilds are loaded on first use and only dirty guilds are written, so the
+    cost of a change no longer depends on how many servers the bot is in.
+    """
+
+    lazy = True
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS guild_config (
+                guild_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            )
+        """)
+
+    def signature(self):
+        # data_version only changes when *another* connection commits
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT guild_id, data FROM guild_config").fetchall()
+        return {guild_id: json.loads(data) for guild_id, data in rows}
+
+    def load_guild(self, guild_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM guild_config WHERE guild_id = ?", (str(guild_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def guild_ids(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT guild_id FROM guild_config")]
+
+    def serialize(self, guilds, dirty):
+        return [(guild_id, json.dumps(guilds[guild_id], separators=(",", ":"))) for guild_id in dirty if guild_id in guilds]
+
+    def write(self, payload):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO guild_config (guild_id, data) VALUES (?, ?) "
+                    "ON CONFLICT (guild_id) DO UPDATE SET data = excluded.data",
+                    payload
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def make_backend(name=GUILD_CONFIG_BACKEND):
+    """ Builds the configured storage backend (``json`` or ``sqlite``) """
+    if name == "sqlite":
+        return SQLiteConfigBackend(GUILD_CONFIG_DB)
+    if name != "json":
+        print(f"⚠️ Unknown GUILD_CONFIG_BACKEND '{name}', falling back to json.")
+    return JsonConfigBackend(SERVER_INFO_FILE)
+
+
+class GuildConfigStore:
+    """ Keeps guild configuration in memory and serves per-guild lookups from it.
+
+    Storage is delegated to a backend. Eager backends (JSON) are read once and
+    lazy ones (SQLite) one guild at a time on first use. Afterwards the backend
+    is only re-read when its change signature moves (checked at most once every
+    ``check_interval`` seconds) or when ``reload()`` is called explicitly.
+
+    Mutations go through ``edit()``/``set()``/``register()``: they apply to the
+    in-memory copy immediately and mark the guild dirty. Dirty guilds are
+    written back at most once per ``flush_interval`` seconds from a worker
+    thread.
+    """
+
+    def __init__(self, backend, check_interval=5.0, flush_interval=CONFIG_FLUSH_INTERVAL):
+        self.backend = backend
+        self.check_interval = check_interval
+        self.flush_interval = flush_interval
+        self._guilds = {}
+        self._missing = set()
+        self._complete = False
+        self._views = {}
+        self._signature = None
+        self._last_check = None
+        self._error = None  # ConfigError from the last read, re-raised until the backend changes
+        self._dirty = set()
+        self._epoch = 0
+        self._revisions = {}
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+    def reload(self):
+        """ Re-reads from the backend unconditionally, dropping unflushed edits """
+        # Checked before reading so a failed read also waits check_interval before the next attempt
+        self._last_check = time.monotonic()
+        self._signature = self.backend.signature()
+        try:
+            guilds = {} if self.backend.lazy else self.backend.load_all()
+        except ConfigError as e:
+            self._error = e
+            raise
+        self._error = None
+        self._guilds = guilds
+        self._complete = not self.backend.lazy
+        self._missing = set()
+        self._views = {}
+        self._dirty.clear()
+        self._epoch += 1
+
+    def _refresh(self):
+        """ Reloads only if the backend changed since the last read """
+        if self._last_check is None:
+            self.reload()
+            return
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self.backend.signature() != self._signature:
+                if self._dirty:
+                    # Unflushed edits win; the next flush overwrites the external change
+                    print("⚠️ Server config changed on disk while edits are pending; keeping in-memory copy.")
+                else:
+                    self.reload()
+                    return
+        if self._error is not None:
+            # The file hasn't changed since it failed to parse; don't re-read it on every lookup
+            raise self._error
+
+    def _lookup(self, key):
+        if key in self._guilds or self._complete or key in self._missing:
+            return self._guilds.get(key)
+        data = self.backend.load_guild(key)
+        if data is None:
+            self._missing.add(key)
+        else:
+            self._guilds[key] = data
+        return data
+
+    def all(self):
+        """ Returns the raw mapping of guild ID -> config (treat as read-only) """
+        self._refresh()
+        if not self._complete:
+            loaded = self.backend.load_all()
+            loaded.update(self._guilds)
+            self._guilds = loaded
+            self._missing = set()
+            self._complete = True
+        return self._guilds
+
+    def guild_ids(self):
+        self._refresh()
+        if self._complete:
+            return list(self._guilds)
+        return list(dict.fromkeys([*self.backend.guild_ids(), *self._guilds]))
+
+    def guild(self, guild_id):
+        """ Returns a GuildConfig view for the guild (empty if unregistered) """
+        self._refresh()
+        key = str(guild_id)
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = GuildConfig(key, self._lookup(key) or {})
+        return view
+
+    def get(self, guild_id, setting, default=None):
+        return self.guild(guild_id).get(setting, default)
+
+    def revision(self, guild_id):
+        """ Returns a token that changes whenever the guild's config may have changed """
+        self._refresh()
+        return (self._epoch, self._revisions.get(str(guild_id), 0))
+
+    def edit(self, guild_id):
+        """ Returns the guild's mutable config dict and schedules it for write-back """
+        self._refresh()
+        key = str(guild_id)
+        data = self._lookup(key)
+        if data is None:
+            data = self._guilds[key] = {}
+            self._missing.discard(key)
+            self._views.pop(key, None)
+        self.mark_dirty(key)
+        return data
+
+    def set(self, guild_id, setting, value):
+        self.edit(guild_id)[setting] = value
+
+    def register(self, guild_id, config):
+        """ Adds a guild's config if it is missing; returns True if it was added """
+        self._refresh()
+        key = str(guild_id)
+        if self._lookup(key) is not None:
+            return False
+        self._guilds[key] = config
+        self._missing.discard(key)
+        self._views.pop(key, None)
+        self.mark_dirty(key)
+        return True
+
+    def mark_dirty(self, guild_id):
+        key = str(guild_id)
+        self._dirty.add(key)
+        self._revisions[key] = self._revisions.get(key, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. a script): the caller flushes with flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    def _snapshot(self):
+        dirty, self._dirty = self._dirty, set()
+        return dirty, self.backend.serialize(self._guilds, dirty)
+
+    def _write(self, dirty, payload):
+        try:
+            self.backend.write(payload)
+        except BaseException:
+            self._dirty |= dirty
+            raise
+        self._signature = self.backend.signature()
+
+    async def flush(self):
+        """ Writes pending edits to the backend off the event loop """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, payload = self._snapshot()
+            await asyncio.to_thread(self._write, dirty, payload)
+
+    def flush_sync(self):
+        if not self._dirty:
+            return
+        self._write(*self._snapshot())
+
+    async def close(self):
+        """ Flushes anything still dirty and stops the pending flush timer """
+        await self.flush()
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self.backend.close()
+
+
+def migrate_json_to_sqlite(json_path=SERVER_INFO_FILE, db_path=GUILD_CONFIG_DB, force=False):
+    """ Imports Server_info.json into the SQLite backend; returns (imported, skipped) guild counts.
+
+    Guilds already in SQLite may have been edited since the JSON file was
+    last written, so they are skipped unless ``force`` is set.
+    """
+    guilds = JsonConfigBackend(json_path).load_all()
+    backend = SQLiteConfigBackend(db_path)
+    try:
+        existing = set() if force else set(backend.guild_ids())
+        imported = [guild_id for guild_id in guilds if guild_id not in existing]
+        backend.write(backend.serialize(guilds, imported))
+    finally:
+        backend.close()
+    return len(imported), len(guilds) - len(imported)
+
+
+guild_config = GuildConfigStore(make_backend())
+
+
+def load_server_info():
+    """ Returns every guild's configuration from the shared in-memory store """
+    return guild_config.all()
+
+
+def get_server_setting(guild_id, setting, default=None):
+    """ Safely retrieves a configuration setting for the guild """
+    return guild_config.get(guild_id, setting, default)
+
+
+def new_server_config(server_name="Unknown Server"):
+    """ Returns a fresh copy of the default configuration for a new guild """
+    config = copy.deepcopy(DEFAULT_SERVER_CONFIG)
+    config["server_name"] = server_name
+    return config
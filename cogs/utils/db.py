@@ -0,0 +1,36 @@
+import os
+
+try:
+    import asyncpg
+except ImportError:  # Postgres support is optional
+    asyncpg = None
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_MAX_CACHED_STATEMENT_LIFETIME = float(os.getenv("DB_MAX_CACHED_STATEMENT_LIFETIME", "300"))
+DB_MAX_INACTIVE_CONNECTION_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_CONNECTION_LIFETIME", "300"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+
+async def create_pool(dsn=DATABASE_URL):
+    """ Creates the bot-wide Postgres pool, or returns None if Postgres isn't configured """
+    if not dsn:
+        print("ℹ️ DATABASE_URL is not set; Postgres-backed features are disabled.")
+        return None
+    if asyncpg is None:
+        print("⚠️ DATABASE_URL is set but asyncpg is not installed; Postgres-backed features are disabled.")
+        return None
+
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        max_cached_statement_lifetime=DB_MAX_CACHED_STATEMENT_LIFETIME,
+        max_inactive_connection_lifetime=DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+        command_timeout=DB_COMMAND_TIMEOUT,
+    )
+    print(f"🐘 Postgres pool ready ({DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE} connections).")
+    return pool
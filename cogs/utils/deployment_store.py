@@ -0,0 +1,198 @@
+import asyncio
+import os
+import sqlite3
+import threading
+
+from cogs.utils.config import DATA_DIR
+
+DEPLOYMENTS_DB = os.path.join(DATA_DIR, "deployments.db")
+
+WEEK = 7 * 86400
+EPOCH_MONDAY = 3 * 86400  # 1970-01-01 was a Thursday, three days after a Monday; weeks start on Monday
+
+
+def week_of(timestamp):
+    """ Monday-based week number of an epoch timestamp """
+    return int((timestamp + EPOCH_MONDAY) // WEEK)
+
+
+def week_start(week):
+    """ Epoch timestamp of the Monday a week number starts on """
+    return week * WEEK - EPOCH_MONDAY
+
+
+class DeploymentStore:
+    """ Deployment history in SQLite (WAL mode).
+
+    A deployment row is written when it starts and closed when it ends, and
+    attendees are appended as (deployment, member) rows. Per-guild
+    deployment counts and per-member attendance are also rolled up by week
+    as each deployment is recorded, so stats over any range of weeks read
+    one row per week (or per member-week) instead of rescanning the history.
+    """
+
+    def __init__(self, path=DEPLOYMENTS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS deployments (
+                deployment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                host_id INTEGER,
+                started_at REAL NOT NULL,
+                ended_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS deployments_guild_idx ON deployments (guild_id, started_at);
+            CREATE TABLE IF NOT EXISTS deployment_attendees (
+                deployment_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                voice_minutes REAL,
+                PRIMARY KEY (deployment_id, user_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS deployment_attendees_member_idx
+                ON deployment_attendees (guild_id, user_id, started_at);
+            CREATE TABLE IF NOT EXISTS deployment_weeks (
+                guild_id INTEGER NOT NULL,
+                week INTEGER NOT NULL,
+                deployments INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, week)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS attendance_weeks (
+                guild_id INTEGER NOT NULL,
+                week INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                attended INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, week, user_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS attendance_weeks_member_idx ON attendance_weeks (guild_id, user_id, week);
+        """)
+        return conn
+
+    async def _run(self, fn, *args, transaction=False):
+        """ Runs ``fn(conn, *args)`` in a worker thread, optionally inside BEGIN IMMEDIATE/COMMIT """
+        def call():
+            with self._lock:
+                if not transaction:
+                    return fn(self._conn, *args)
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(self._conn, *args)
+                    self._conn.execute("COMMIT")
+                    return result
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._open)
+        return await asyncio.to_thread(call)
+
+    async def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def start(self, guild_id, host_id, started_at):
+        """ Records a deployment's start and returns its ID """
+        return await self._run(lambda conn: conn.execute(
+            "INSERT INTO deployments (guild_id, host_id, started_at) VALUES (?, ?, ?)",
+            (guild_id, host_id, started_at)
+        ).lastrowid)
+
+    @staticmethod
+    def _add_attendees(conn, deployment_id, guild_id, started_at, attendees, voice_minutes):
+        week = week_of(started_at)
+        for user_id in attendees:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO deployment_attendees (deployment_id, user_id, guild_id, started_at, voice_minutes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (deployment_id, user_id, guild_id, started_at, voice_minutes.get(user_id))
+            ).rowcount
+            if inserted:
+                conn.execute(
+                    "INSERT INTO attendance_weeks (guild_id, week, user_id, attended) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (guild_id, week, user_id) DO UPDATE SET attended = attended + 1",
+                    (guild_id, week, user_id)
+                )
+
+    async def finish(self, deployment_id, guild_id, started_at, ended_at, attendees, voice_minutes):
+        """ Closes a deployment, appends its attendees and updates the weekly rollups """
+        def finish(conn):
+            conn.execute("UPDATE deployments SET ended_at = ? WHERE deployment_id = ?", (ended_at, deployment_id))
+            conn.execute(
+                "INSERT INTO deployment_weeks (guild_id, week, deployments) VALUES (?, ?, 1) "
+                "ON CONFLICT (guild_id, week) DO UPDATE SET deployments = deployments + 1",
+                (guild_id, week_of(started_at))
+            )
+            self._add_attendees(conn, deployment_id, guild_id, started_at, attendees, voice_minutes)
+        await self._run(finish, transaction=True)
+
+    async def close_orphans(self):
+        """ Closes deployments left open by a restart and returns how many there were.
+
+        Deployment state lives in memory, so an open row at load time can
+        never be finished. Its end time is unknown; it's closed at its start
+        and still counted in the weekly rollup, since attendees approved
+        during it may already be recorded.
+        """
+        def close_orphans(conn):
+            orphans = conn.execute("SELECT guild_id, started_at FROM deployments WHERE ended_at IS NULL").fetchall()
+            conn.execute("UPDATE deployments SET ended_at = started_at WHERE ended_at IS NULL")
+            for guild_id, started_at in orphans:
+                conn.execute(
+                    "INSERT INTO deployment_weeks (guild_id, week, deployments) VALUES (?, ?, 1) "
+                    "ON CONFLICT (guild_id, week) DO UPDATE SET deployments = deployments + 1",
+                    (guild_id, week_of(started_at))
+                )
+            return len(orphans)
+        return await self._run(close_orphans, transaction=True)
+
+    async def add_attendees(self, deployment_id, guild_id, started_at, attendees):
+        """ Appends attendees approved after their deployment was recorded """
+        await self._run(self._add_attendees, deployment_id, guild_id, started_at, attendees, {}, transaction=True)
+
+    async def latest(self, guild_id):
+        """ (started_at, ended_at, attendee IDs) of the guild's most recent finished deployment, or None """
+        def latest(conn):
+            row = conn.execute(
+                "SELECT deployment_id, started_at, ended_at FROM deployments "
+                "WHERE guild_id = ? AND ended_at IS NOT NULL ORDER BY started_at DESC LIMIT 1",
+                (guild_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            attendees = [user_id for user_id, in conn.execute(
+                "SELECT user_id FROM deployment_attendees WHERE deployment_id = ?", (row[0],)
+            )]
+            return row[1], row[2], attendees
+        return await self._run(latest)
+
+    async def weekly(self, guild_id, first_week, last_week):
+        """ [(week, deployments)] for weeks in [first_week, last_week] that had any """
+        return await self._run(lambda conn: conn.execute(
+            "SELECT week, deployments FROM deployment_weeks WHERE guild_id = ? AND week BETWEEN ? AND ? ORDER BY week",
+            (guild_id, first_week, last_week)
+        ).fetchall())
+
+    async def top_attendees(self, guild_id, first_week, last_week, limit):
+        """ [(user_id, deployments attended)] in [first_week, last_week], most first """
+        return await self._run(lambda conn: conn.execute(
+            "SELECT user_id, SUM(attended) AS total FROM attendance_weeks "
+            "WHERE guild_id = ? AND week BETWEEN ? AND ? GROUP BY user_id ORDER BY total DESC, user_id LIMIT ?",
+            (guild_id, first_week, last_week, limit)
+        ).fetchall())
+
+    async def member_attended(self, guild_id, user_id, first_week, last_week):
+        return await self._run(lambda conn: conn.execute(
+            "SELECT COALESCE(SUM(attended), 0) FROM attendance_weeks WHERE guild_id = ? AND user_id = ? AND week BETWEEN ? AND ?",
+            (guild_id, user_id, first_week, last_week)
+        ).fetchone()[0])
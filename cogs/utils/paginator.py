@@ -0,0 +1,72 @@
+import discord
+
+EMBED_DESCRIPTION_LIMIT = 4096
+
+
+def chunk_lines(lines, max_lines=20, max_chars=EMBED_DESCRIPTION_LIMIT):
+    """ Groups lines into pages that respect both a line count and a character budget """
+    pages, page, size = [], [], 0
+    for line in lines:
+        line = line[:max_chars]
+        extra = len(line) + (1 if page else 0)
+        if page and (len(page) >= max_lines or size + extra > max_chars):
+            pages.append("\n".join(page))
+            page, size, extra = [], 0, len(line)
+        page.append(line)
+        size += extra
+    if page:
+        pages.append("\n".join(page))
+    return pages
+
+
+class EmbedPages(discord.ui.View):
+    """ Pages a long list of lines through one embed with Previous/Next buttons """
+
+    def __init__(self, author_id, title, lines, color=discord.Color.blue(), max_lines=20, timeout=180):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.title = title
+        self.color = color
+        self.pages = chunk_lines(lines, max_lines=max_lines) or ["Nothing to show."]
+        self.index = 0
+        self.message = None
+        self._sync_buttons()
+
+    def embed(self):
+        embed = discord.Embed(title=self.title, description=self.pages[self.index], color=self.color)
+        embed.set_footer(text=f"Page {self.index + 1}/{len(self.pages)}")
+        return embed
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+
+    async def send(self, ctx):
+        view = self if len(self.pages) > 1 else None
+        self.message = await ctx.send(embed=self.embed(), view=view)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("⚠️ Only the person who ran this command can change pages.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction, index):
+        self.index = max(0, min(index, len(self.pages) - 1))
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, self.index - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, self.index + 1)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
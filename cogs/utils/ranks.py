@@ -0,0 +1,204 @@
+import asyncio
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+
+import discord
+
+from cogs.utils.checks import resolve_role_entry, role_ids_by_name
+from cogs.utils.config import guild_config
+
+RANK_SYNC_CONCURRENCY = int(os.getenv("RANK_SYNC_CONCURRENCY", "2"))
+RANK_SUMMARY_INTERVAL = float(os.getenv("RANK_SUMMARY_INTERVAL", "60"))
+
+
+class RankLadder:
+    """ ``roles.xp_roles`` thresholds as parallel sorted arrays; XP -> rank is a binary search """
+
+    __slots__ = ("thresholds", "names", "role_ids")
+
+    def __init__(self, guild, xp_roles):
+        ids_by_name = role_ids_by_name(guild)
+        ladder = sorted((int(threshold), str(name)) for name, threshold in xp_roles.items())
+        self.thresholds = [threshold for threshold, _ in ladder]
+        self.names = [name for _, name in ladder]
+        self.role_ids = []
+        for name in self.names:
+            resolved = resolve_role_entry(guild, name, ids_by_name)
+            self.role_ids.append(resolved[0] if resolved else None)
+
+    def index_for(self, xp):
+        """ Index of the highest threshold <= xp, or -1 below the first rung """
+        return bisect_right(self.thresholds, xp) - 1
+
+    def all_role_ids(self):
+        return {role_id for role_id in self.role_ids if role_id is not None}
+
+    def role_diff(self, member, xp):
+        """ Returns (target index, role IDs to add, role IDs to remove) for the member """
+        index = self.index_for(xp)
+        target = self.role_ids[index] if index >= 0 else None
+        held = self.all_role_ids().intersection(role.id for role in member.roles)
+        wanted = {target} if target is not None else set()
+        return index, wanted - held, held - wanted
+
+
+class RankEngine:
+    """ Keeps members' XP rank roles in line with ``roles.xp_roles``.
+
+    Changes go through a queue keyed by (guild_id, member_id): queueing the same
+    member again before they are processed just replaces their target XP. A
+    small, fixed number of workers applies each member's diff in one
+    ``Member.edit(roles=...)`` call, so bursts don't fan out into one request
+    per role per award. Promotions and demotions are announced in batched
+    summaries to the configured ``promotion``/``demotion`` channels.
+    """
+
+    def __init__(self, bot, concurrency=RANK_SYNC_CONCURRENCY, summary_interval=RANK_SUMMARY_INTERVAL):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.summary_interval = summary_interval
+        self._ladders = {}  # guild_id -> (config revision, RankLadder); dropped by invalidate() on role changes
+        self._queue = OrderedDict()  # (guild_id, member_id) -> xp
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._busy = 0
+        self._workers = []
+        self._summaries = {}  # guild_id -> {"promotion": [...], "demotion": [...]}
+        self._summary_task = None
+
+    def ladder(self, guild):
+        """ Returns the guild's compiled ladder, or None if no xp_roles are configured """
+        revision = guild_config.revision(guild.id)
+        cached = self._ladders.get(guild.id)
+        if cached is None or cached[0] != revision:
+            xp_roles = guild_config.guild(guild.id).roles.get("xp_roles") or {}
+            ladder = RankLadder(guild, xp_roles) if xp_roles else None
+            cached = self._ladders[guild.id] = (revision, ladder)
+        return cached[1]
+
+    def invalidate(self, guild_id=None):
+        if guild_id is None:
+            self._ladders.clear()
+        else:
+            self._ladders.pop(guild_id, None)
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+        await self.post_summaries()
+
+    def enqueue(self, guild_id, member_id, xp):
+        """ Queues a member for a rank check; repeated changes for a member are merged """
+        self.start()
+        key = (guild_id, member_id)
+        self._queue[key] = xp
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def wait_idle(self):
+        """ Waits until every queued member has been processed """
+        await self._idle.wait()
+
+    async def _worker(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            (guild_id, member_id), xp = self._queue.popitem(last=False)
+            self._busy += 1
+            try:
+                await self._apply(guild_id, member_id, xp)
+            except Exception as e:
+                print(f"⚠️ Rank sync failed for {member_id} in {guild_id}: {e}")
+            finally:
+                self._busy -= 1
+                if not self._queue and not self._busy:
+                    self._idle.set()
+
+    async def _apply(self, guild_id, member_id, xp):
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild else None
+        if member is None:
+            return
+
+        ladder = self.ladder(guild)
+        if ladder is None:
+            return
+
+        before = max((ladder.role_ids.index(role.id) for role in member.roles if role.id in ladder.all_role_ids()), default=-1)
+        index, to_add, to_remove = ladder.role_diff(member, xp)
+        if not to_add and not to_remove:
+            return
+
+        roles = [role for role in member.roles if not role.is_default() and role.id not in to_remove]
+        roles.extend(guild.get_role(role_id) for role_id in to_add)
+        await member.edit(roles=roles, reason=f"XP rank sync ({xp} XP)")
+
+        if index != before:
+            kind = "promotion" if index > before else "demotion"
+            old_rank = ladder.names[before] if before >= 0 else "Unranked"
+            new_rank = ladder.names[index] if index >= 0 else "Unranked"
+            self._record(guild_id, kind, f"<@{member_id}>: {old_rank} → **{new_rank}** ({xp} XP)")
+
+    def _record(self, guild_id, kind, line):
+        self._summaries.setdefault(guild_id, {"promotion": [], "demotion": []})[kind].append(line)
+        if self._summary_task is None or self._summary_task.done():
+            self._summary_task = asyncio.create_task(self._delayed_summaries())
+
+    async def _delayed_summaries(self):
+        await asyncio.sleep(self.summary_interval)
+        await self.post_summaries()
+
+    async def post_summaries(self):
+        """ Sends one batched summary per guild and channel for everything recorded so far """
+        summaries, self._summaries = self._summaries, {}
+        for guild_id, kinds in summaries.items():
+            config = guild_config.guild(guild_id)
+            for kind, lines in kinds.items():
+                channel = self.bot.get_channel(config.channel(kind)) if lines else None
+                if channel is None:
+                    continue
+
+                title = "📈 Promotions" if kind == "promotion" else "📉 Demotions"
+                color = discord.Color.green() if kind == "promotion" else discord.Color.orange()
+                chunk = []
+                for line in lines + [None]:
+                    if line is None or sum(len(entry) + 1 for entry in chunk) + len(line) > 4000:
+                        if chunk:
+                            await channel.send(embed=discord.Embed(title=f"{title} ({len(lines)})", description="\n".join(chunk), color=color))
+                        chunk = []
+                    if line is not None:
+                        chunk.append(line)
+
+    async def resync(self, guild, xp_by_member, chunk_size=100):
+        """ Streams every member through the queue in chunks; returns how many needed changes """
+        ladder = self.ladder(guild)
+        if ladder is None:
+            return 0
+
+        queued = 0
+        members = guild.members
+        for start in range(0, len(members), chunk_size):
+            for member in members[start:start + chunk_size]:
+                if member.bot:
+                    continue
+                xp = xp_by_member.get(member.id, 0)
+                _, to_add, to_remove = ladder.role_diff(member, xp)
+                if to_add or to_remove:
+                    self.enqueue(guild.id, member.id, xp)
+                    queued += 1
+            # Let the workers drain this chunk before queueing the next one
+            await self.wait_idle()
+        await self.post_summaries()
+        return queued
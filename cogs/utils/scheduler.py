@@ -0,0 +1,158 @@
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cogs.utils.config import DATA_DIR
+
+TIMERS_DB = os.path.join(DATA_DIR, "timers.db")
+
+
+class Timer:
+    """ A pending expiry. When due, the bot dispatches ``on_<event>_timer_complete(timer)`` """
+
+    __slots__ = ("id", "event", "due", "payload")
+
+    def __init__(self, id, event, due, payload):
+        self.id = id
+        self.event = event
+        self.due = due
+        self.payload = payload
+
+    def __repr__(self):
+        return f"<Timer id={self.id} event={self.event!r} due={self.due:.0f}>"
+
+
+class TimerScheduler:
+    """ Durable timers for any cog, driven by one background task.
+
+    Pending timers live in a small SQLite table so they survive restarts, and
+    in a min-heap keyed on due time so a single task can sleep until the next
+    one instead of keeping a sleeping coroutine per timer. Handlers should be
+    idempotent: a timer that fires right before a crash may fire again on the
+    next start.
+    """
+
+    def __init__(self, bot, path=TIMERS_DB):
+        self.bot = bot
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._heap = []  # (due, timer_id); cancelled entries are skipped lazily
+        self._timers = {}
+        self._wakeup = asyncio.Event()
+        self._started = asyncio.Event()
+        self._task = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS timers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event TEXT NOT NULL,
+                due REAL NOT NULL,
+                payload TEXT NOT NULL
+            )
+        """)
+        rows = conn.execute("SELECT id, event, due, payload FROM timers").fetchall()
+        return conn, rows
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params)
+
+    async def start(self):
+        """ Loads pending timers from disk and starts the dispatch task.
+
+        Call this once the cogs are loaded so overdue timers have listeners.
+        """
+        if self._task is not None:
+            return
+        self._conn, rows = await asyncio.to_thread(self._open)
+        for timer_id, event, due, payload in rows:
+            self._timers[timer_id] = Timer(timer_id, event, due, json.loads(payload))
+        self._heap = [(timer.due, timer.id) for timer in self._timers.values()]
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+        self._started.set()
+        print(f"⏲️ Timer scheduler started with {len(self._timers)} pending timers.")
+
+    async def wait_started(self):
+        """ Waits until ``start()`` has run, for cogs that schedule timers while loading """
+        await self._started.wait()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def create(self, event, seconds, **payload):
+        """ Schedules ``event`` to fire ``seconds`` from now with the given payload """
+        if self._conn is None:
+            raise RuntimeError("Timer scheduler has not been started")
+        due = time.time() + seconds
+        cursor = await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO timers (event, due, payload) VALUES (?, ?, ?)",
+            (event, due, json.dumps(payload))
+        )
+        timer = Timer(cursor.lastrowid, event, due, payload)
+        self._timers[timer.id] = timer
+        heapq.heappush(self._heap, (timer.due, timer.id))
+        if self._heap[0][1] == timer.id:
+            self._wakeup.set()
+        return timer
+
+    async def cancel(self, timer_id):
+        """ Cancels a pending timer; returns False if it already fired or never existed """
+        if self._timers.pop(timer_id, None) is None:
+            return False
+        await asyncio.to_thread(self._execute, "DELETE FROM timers WHERE id = ?", (timer_id,))
+        return True
+
+    def find(self, event, **match):
+        """ Returns pending timers for ``event`` whose payload contains ``match`` """
+        return [
+            timer for timer in self._timers.values()
+            if timer.event == event and all(timer.payload.get(key) == value for key, value in match.items())
+        ]
+
+    async def cancel_matching(self, event, **match):
+        timers = self.find(event, **match)
+        for timer in timers:
+            await self.cancel(timer.id)
+        return len(timers)
+
+    async def _run(self):
+        while True:
+            while self._heap and self._heap[0][1] not in self._timers:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, timer_id = heapq.heappop(self._heap)
+            timer = self._timers.pop(timer_id)
+            self.bot.dispatch(f"{timer.event}_timer_complete", timer)
+            try:
+                await asyncio.to_thread(self._execute, "DELETE FROM timers WHERE id = ?", (timer_id,))
+            except sqlite3.Error as e:
+                print(f"⚠️ Failed to clear fired timer {timer_id}: {e}")
@@ -0,0 +1,50 @@
+from array import array
+
+
+class VoiceAttendance:
+    """ Time each member spends in a deployment's voice channels.
+
+    A member's presence is kept as a flat array of [join, leave, join, leave,
+    ...] timestamps. Voice events arrive in time order, so a new interval can
+    only overlap or touch the member's last one; merging it on append keeps
+    every array sorted and disjoint, and memory grows with the number of
+    voice events rather than with the deployment's length. ``channel_ids`` of
+    None tracks every voice channel in the guild.
+    """
+
+    __slots__ = ("channel_ids", "joined", "intervals")
+
+    def __init__(self, channel_ids=None):
+        self.channel_ids = frozenset(channel_ids) if channel_ids else None
+        self.joined = {}  # member_id -> join time of the open session
+        self.intervals = {}  # member_id -> array('d') of closed [start, end] pairs
+
+    def tracks(self, channel):
+        return channel is not None and (self.channel_ids is None or channel.id in self.channel_ids)
+
+    def join(self, member_id, at):
+        self.joined.setdefault(member_id, at)
+
+    def leave(self, member_id, at):
+        start = self.joined.pop(member_id, None)
+        if start is None or at <= start:
+            return
+        spans = self.intervals.get(member_id)
+        if spans is None:
+            self.intervals[member_id] = array("d", (start, at))
+        elif start <= spans[-1]:  # Overlaps or touches the last interval
+            spans[-1] = max(spans[-1], at)
+        else:
+            spans.extend((start, at))
+
+    def close(self, at):
+        """ Ends every open session at ``at`` """
+        for member_id in list(self.joined):
+            self.leave(member_id, at)
+
+    def minutes(self):
+        """ Returns {member_id: minutes in voice} over the closed intervals, in one pass """
+        return {
+            member_id: sum(spans[index + 1] - spans[index] for index in range(0, len(spans), 2)) / 60
+            for member_id, spans in self.intervals.items()
+        }
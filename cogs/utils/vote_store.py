@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+
+from cogs.utils.ballots import YES_NO_OPTIONS
+from cogs.utils.config import DATA_DIR
+
+VOTES_DB = os.path.join(DATA_DIR, "votes.db")
+
+
+class VoteRecord:
+    """ A vote's settings plus its ballots as (packed ranking, weight) pairs and its voters """
+
+    __slots__ = ("vote_id", "guild_id", "channel_id", "message_id", "question", "required_votes",
+                 "max_votes", "end_time", "closed", "kind", "options", "ballots", "voters")
+
+    def __init__(self, row, ballots):
+        (self.vote_id, self.guild_id, self.channel_id, self.message_id, self.question, self.required_votes,
+         self.max_votes, self.end_time, self.closed, self.kind, options) = row
+        self.options = json.loads(options) if options else list(YES_NO_OPTIONS)
+        self.ballots = []
+        self.voters = set()
+        for user_id, weight, ranking in ballots:
+            self.ballots.append((bytes(ranking), weight))
+            self.voters.add(user_id)
+
+
+class VoteStore:
+    """ Votes and ballots in SQLite (WAL mode).
+
+    Vote IDs come from an AUTOINCREMENT key, so they are never reused. A
+    ballot is a single INSERT, and its primary key on (vote_id, user_id) also
+    enforces one ballot per member across restarts. Rankings are stored as
+    packed option indices (one byte each). Tallies are not stored: they are
+    rebuilt from the ballots when a vote is loaded.
+    """
+
+    def __init__(self, path=VOTES_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS votes (
+                vote_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER,
+                question TEXT NOT NULL,
+                required_votes INTEGER NOT NULL,
+                max_votes INTEGER NOT NULL,
+                end_time REAL NOT NULL,
+                closed INTEGER NOT NULL DEFAULT 0,
+                kind TEXT NOT NULL DEFAULT 'yesno',
+                options TEXT
+            );
+            CREATE INDEX IF NOT EXISTS votes_open_idx ON votes (closed, vote_id);
+            CREATE TABLE IF NOT EXISTS ballots (
+                vote_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                choice TEXT NOT NULL,
+                weight INTEGER NOT NULL,
+                ranking BLOB NOT NULL,
+                PRIMARY KEY (vote_id, user_id)
+            ) WITHOUT ROWID;
+        """)
+        return conn
+
+    async def _run(self, fn):
+        def call():
+            with self._lock:
+                return fn(self._conn)
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._open)
+        return await asyncio.to_thread(call)
+
+    async def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def create(self, guild_id, channel_id, question, required_votes, max_votes, end_time, kind="yesno", options=None):
+        """ Inserts a new vote and returns its ID """
+        return await self._run(lambda conn: conn.execute(
+            "INSERT INTO votes (guild_id, channel_id, question, required_votes, max_votes, end_time, kind, options) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (guild_id, channel_id, question, required_votes, max_votes, end_time, kind, json.dumps(options) if options else None)
+        ).lastrowid)
+
+    async def set_message(self, vote_id, message_id):
+        await self._run(lambda conn: conn.execute("UPDATE votes SET message_id = ? WHERE vote_id = ?", (message_id, vote_id)))
+
+    async def add_ballot(self, vote_id, user_id, choice, weight, ranking):
+        """ Appends a ballot (``choice`` is its readable first choice); returns False if the member already voted """
+        return await self._run(lambda conn: conn.execute(
+            "INSERT OR IGNORE INTO ballots (vote_id, user_id, choice, weight, ranking) VALUES (?, ?, ?, ?, ?)",
+            (vote_id, user_id, choice, weight, ranking)
+        ).rowcount == 1)
+
+    async def mark_closed(self, vote_id):
+        await self._run(lambda conn: conn.execute("UPDATE votes SET closed = 1 WHERE vote_id = ?", (vote_id,)))
+
+    async def open_votes(self):
+        """ (vote_id, channel_id, message_id, end_time, kind, options) for every open vote that was posted """
+        rows = await self._run(lambda conn: conn.execute(
+            "SELECT vote_id, channel_id, message_id, end_time, kind, options FROM votes WHERE closed = 0 AND message_id IS NOT NULL ORDER BY vote_id"
+        ).fetchall())
+        return [row[:5] + (json.loads(row[5]) if row[5] else list(YES_NO_OPTIONS),) for row in rows]
+
+    async def load(self, vote_id):
+        """ Returns the vote's VoteRecord, or None if it doesn't exist """
+        def load(conn):
+            row = conn.execute(
+                "SELECT vote_id, guild_id, channel_id, message_id, question, required_votes, max_votes, end_time, closed, "
+                "kind, options FROM votes WHERE vote_id = ?",
+                (vote_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            ballots = conn.execute("SELECT user_id, weight, ranking FROM ballots WHERE vote_id = ?", (vote_id,)).fetchall()
+            return VoteRecord(row, ballots)
+        return await self._run(load)
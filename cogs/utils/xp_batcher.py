@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+XP_FLUSH_INTERVAL = float(os.getenv("XP_FLUSH_INTERVAL", "2"))
+XP_FLUSH_THRESHOLD = int(os.getenv("XP_FLUSH_THRESHOLD", "500"))
+
+
+class XPBatcher:
+    """ Merges XP awards in memory and writes them in one transaction per flush.
+
+    Increments are keyed by (guild_id, user_id, system_name) and merged;
+    ledger events are kept one per award, so the ledger still records every
+    award with its own amount. Both are handed to the XP store's
+    ``apply_batch`` so they commit together. A flush happens
+    ``interval`` seconds after the first pending award, or immediately once
+    ``threshold`` distinct keys are pending. Reads should add ``pending()`` to
+    the stored total so users see their new XP straight away. ``on_flush`` is
+    called with the committed keys after every successful flush.
+    """
+
+    def __init__(self, store, interval=XP_FLUSH_INTERVAL, threshold=XP_FLUSH_THRESHOLD, on_flush=None):
+        self.store = store
+        self.on_flush = on_flush
+        self.interval = interval
+        self.threshold = threshold
+        self._pending = {}
+        self._inflight = {}
+        self._events = []  # (guild_id, user_id, system_name, delta, actor_id, reason), one per award
+        self._timer = None
+        self._flush_task = None  # Threshold flush, so a burst of awards schedules only one
+        self._lock = asyncio.Lock()
+
+    def add(self, guild_id, user_id, system_name, amount, actor_id=None, reason=None):
+        key = (guild_id, user_id, system_name)
+        self._pending[key] = self._pending.get(key, 0) + amount
+        self._events.append((guild_id, user_id, system_name, amount, actor_id, reason))
+
+        if len(self._pending) >= self.threshold:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._background_flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._delayed_flush())
+
+    def pending(self, guild_id, user_id, system_name):
+        """ XP awarded but not yet committed for this key """
+        key = (guild_id, user_id, system_name)
+        return self._pending.get(key, 0) + self._inflight.get(key, 0)
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.interval)
+        await self._background_flush()
+
+    async def _background_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️ XP flush failed, will retry: {e}")
+            if self._timer is None or self._timer.done() or self._timer is asyncio.current_task():
+                self._timer = asyncio.create_task(self._delayed_flush())
+
+    async def flush(self):
+        """ Commits every pending increment and its ledger events in one transaction """
+        async with self._lock:
+            if not self._pending:
+                return
+            self._inflight, self._pending = self._pending, {}
+            events, self._events = self._events, []
+            batch = [(key, amount) for key, amount in self._inflight.items() if amount]
+            try:
+                await self.store.apply_batch(batch, [event for event in events if event[3]])
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                for key, amount in self._inflight.items():
+                    self._pending[key] = self._pending.get(key, 0) + amount
+                self._events[:0] = events
+                raise
+            finally:
+                committed, self._inflight = self._inflight, {}
+
+            if self.on_flush is not None:
+                self.on_flush(committed.keys())
+
+    async def close(self):
+        """ Flushes everything still pending; call on cog unload and shutdown """
+        await self.flush()
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
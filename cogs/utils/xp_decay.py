@@ -0,0 +1,136 @@
+import math
+
+CURVES = ("none", "linear", "exponential")
+
+ADD_ACTIVITY_COLUMNS = """
+    ALTER TABLE user_xp
+        ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        ADD COLUMN IF NOT EXISTS decayed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+"""
+
+CREATE_DECAY_SETTINGS = """
+    CREATE TABLE IF NOT EXISTS xp_decay (
+        guild_id BIGINT PRIMARY KEY,
+        curve TEXT NOT NULL DEFAULT 'none',
+        grace_days DOUBLE PRECISION NOT NULL DEFAULT 0,
+        rate DOUBLE PRECISION NOT NULL DEFAULT 0
+    )
+"""
+
+# Days of decay owed: counted from the later of the last materialization and
+# the end of the member's grace period after their last activity.
+# timestamptz/interval arithmetic depends on the session TimeZone, so these are STABLE
+CREATE_DECAY_DAYS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION xp_decay_days(
+        last_activity_at TIMESTAMPTZ, decayed_at TIMESTAMPTZ, grace_days DOUBLE PRECISION, at TIMESTAMPTZ
+    ) RETURNS DOUBLE PRECISION LANGUAGE sql STABLE AS $$
+        SELECT GREATEST(0, EXTRACT(EPOCH FROM at - GREATEST(decayed_at, last_activity_at + grace_days * interval '1 day')) / 86400)
+    $$
+"""
+
+# The one decay curve used everywhere effective XP is read or materialized.
+# linear: ``rate`` XP lost per day; exponential: ``rate`` is the half-life in days.
+# Losses are rounded down, so nothing decays until a whole point is owed
+CREATE_DECAY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION xp_effective(
+        xp INTEGER, last_activity_at TIMESTAMPTZ, decayed_at TIMESTAMPTZ,
+        curve TEXT, grace_days DOUBLE PRECISION, rate DOUBLE PRECISION, at TIMESTAMPTZ
+    ) RETURNS INTEGER LANGUAGE sql STABLE AS $$
+        SELECT CASE
+            WHEN xp <= 0 OR curve IS NULL OR curve = 'none' OR rate <= 0 THEN xp
+            WHEN curve = 'linear' THEN
+                GREATEST(0, xp - floor(rate * xp_decay_days(last_activity_at, decayed_at, grace_days, at)))::integer
+            WHEN curve = 'exponential' THEN
+                (xp - floor(xp * (1 - power(0.5, xp_decay_days(last_activity_at, decayed_at, grace_days, at) / rate))))::integer
+            ELSE xp
+        END
+    $$
+"""
+
+# The decay checkpoint after materializing ``effective``: the moment the whole
+# points removed were owed. The fraction of a point owed beyond it stays owed,
+# so repeated materializations remove exactly what xp_effective() predicts
+CREATE_DECAYED_THROUGH_FUNCTION = """
+    CREATE OR REPLACE FUNCTION xp_decayed_through(
+        xp INTEGER, effective INTEGER, last_activity_at TIMESTAMPTZ, decayed_at TIMESTAMPTZ,
+        curve TEXT, grace_days DOUBLE PRECISION, rate DOUBLE PRECISION, at TIMESTAMPTZ
+    ) RETURNS TIMESTAMPTZ LANGUAGE sql STABLE AS $$
+        SELECT LEAST(at, GREATEST(decayed_at, last_activity_at + grace_days * interval '1 day') + interval '1 day' * CASE
+            WHEN curve = 'linear' THEN (xp - effective) / rate
+            WHEN curve = 'exponential' AND effective > 0 THEN rate * ln(xp::double precision / effective) / ln(2)
+            ELSE 'Infinity'::double precision
+        END)
+    $$
+"""
+
+# SQL expression for a user_xp row aliased ``u`` joined to its guild's settings as ``d``
+EFFECTIVE_XP = "xp_effective(u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate, now())"
+
+# Folds owed decay into the stored XP of the given keys and records it in the
+# ledger, so the following write starts from the effective value
+MATERIALIZE_DECAY = f"""
+    WITH owed AS (
+        SELECT u.guild_id, u.user_id, u.system_name, u.xp, u.last_activity_at, u.decayed_at,
+               d.curve, d.grace_days, d.rate, {EFFECTIVE_XP} AS effective
+        FROM user_xp u
+        JOIN unnest($1::bigint[], $2::bigint[], $3::text[]) AS k(guild_id, user_id, system_name)
+          USING (guild_id, user_id, system_name)
+        JOIN xp_decay d ON d.guild_id = u.guild_id
+        WHERE d.curve <> 'none'
+        FOR UPDATE OF u
+    ), updated AS (
+        UPDATE user_xp u SET xp = owed.effective, decayed_at = xp_decayed_through(
+            owed.xp, owed.effective, owed.last_activity_at, owed.decayed_at, owed.curve, owed.grace_days, owed.rate, now()
+        )
+        FROM owed
+        WHERE u.guild_id = owed.guild_id AND u.user_id = owed.user_id AND u.system_name = owed.system_name
+          AND owed.effective <> owed.xp
+    )
+    INSERT INTO xp_events (guild_id, user_id, system_name, delta, reason)
+    SELECT guild_id, user_id, system_name, effective - xp, 'Inactivity decay'
+    FROM owed WHERE effective <> xp
+"""
+
+
+def effective_xp(xp, last_activity_at, decayed_at, curve, grace_days, rate, at):
+    """ Python twin of the xp_effective() SQL function; timestamps are epoch seconds """
+    if xp is None or xp <= 0 or curve is None or curve == "none" or rate is None or rate <= 0:
+        return xp
+    start = max(decayed_at, last_activity_at + grace_days * 86400)
+    days = max(0.0, (at - start) / 86400)
+    if curve == "linear":
+        return max(0, xp - math.floor(rate * days))
+    if curve == "exponential":
+        return xp - math.floor(xp * (1 - 0.5 ** (days / rate)))
+    return xp
+
+
+def decayed_through(xp, effective, last_activity_at, decayed_at, curve, grace_days, rate, at):
+    """ Python twin of xp_decayed_through(); timestamps are epoch seconds """
+    start = max(decayed_at, last_activity_at + grace_days * 86400)
+    if curve == "linear":
+        days = (xp - effective) / rate
+    elif curve == "exponential" and effective > 0:
+        days = rate * math.log2(xp / effective)
+    else:
+        return at
+    return min(at, start + days * 86400)
+
+
+async def initialize_decay(conn):
+    await conn.execute(ADD_ACTIVITY_COLUMNS)
+    await conn.execute(CREATE_DECAY_SETTINGS)
+    await conn.execute(CREATE_DECAY_DAYS_FUNCTION)
+    await conn.execute(CREATE_DECAY_FUNCTION)
+    await conn.execute(CREATE_DECAYED_THROUGH_FUNCTION)
+
+
+async def materialize(conn, keys):
+    """ Applies owed decay to (guild_id, user_id, system_name) keys; call inside the write's transaction """
+    keys = list(keys)
+    if not keys:
+        return
+    await conn.execute(
+        MATERIALIZE_DECAY,
+        [key[0] for key in keys], [key[1] for key in keys], [key[2] for key in keys]
+    )
@@ -0,0 +1,205 @@
+import datetime
+
+XP_REBUILD_BATCH = 1000
+
+CREATE_LEDGER = """
+    CREATE TABLE IF NOT EXISTS xp_events (
+        event_id BIGINT GENERATED ALWAYS AS IDENTITY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        system_name TEXT NOT NULL,
+        delta INTEGER NOT NULL,
+        actor_id BIGINT,
+        reason TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (created_at, event_id)
+    ) PARTITION BY RANGE (created_at)
+"""
+
+CREATE_LEDGER_INDEX = """
+    CREATE INDEX IF NOT EXISTS xp_events_member_idx
+    ON xp_events (guild_id, user_id, system_name, created_at DESC, event_id DESC)
+"""
+
+CREATE_LEDGER_DEFAULT_PARTITION = """
+    CREATE TABLE IF NOT EXISTS xp_events_default PARTITION OF xp_events DEFAULT
+"""
+
+# Sums of events from partitions that were detached, so rebuilds stay exact
+CREATE_CHECKPOINTS = """
+    CREATE TABLE IF NOT EXISTS xp_ledger_checkpoints (
+        guild_id BIGINT,
+        user_id BIGINT,
+        system_name TEXT,
+        xp BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, user_id, system_name)
+    )
+"""
+
+# Seeds the ledger from totals that predate it (runs only while the ledger is empty)
+SEED_OPENING_BALANCES = """
+    INSERT INTO xp_events (guild_id, user_id, system_name, delta, reason)
+    SELECT guild_id, user_id, system_name, xp, 'Opening balance'
+    FROM user_xp
+    WHERE xp <> 0 AND NOT EXISTS (SELECT 1 FROM xp_events)
+"""
+
+INSERT_EVENTS = """
+    INSERT INTO xp_events (guild_id, user_id, system_name, delta, actor_id, reason)
+    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::text[], $4::integer[], $5::bigint[], $6::text[])
+"""
+
+
+def month_start(moment):
+    return datetime.datetime(moment.year, moment.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def next_month(moment):
+    return datetime.datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def partition_name(moment):
+    return f"xp_events_{moment.year:04d}_{moment.month:02d}"
+
+
+async def ensure_partitions(conn, months_ahead=1, now=None):
+    """ Creates monthly partitions for the current month and the next ``months_ahead`` """
+    start = month_start(now or datetime.datetime.now(datetime.timezone.utc))
+    for _ in range(months_ahead + 1):
+        end = next_month(start)
+        exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", partition_name(start))
+        if not exists:
+            await conn.execute(
+                f"CREATE TABLE {partition_name(start)} PARTITION OF xp_events "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        start = end
+
+
+_ensured_month = None
+
+
+async def maybe_ensure_partitions(conn):
+    """ Re-checks partitions once per calendar month from the write path """
+    global _ensured_month
+    current = month_start(datetime.datetime.now(datetime.timezone.utc))
+    if current != _ensured_month:
+        await ensure_partitions(conn)
+        _ensured_month = current
+
+
+async def initialize_ledger(conn):
+    await conn.execute(CREATE_LEDGER)
+    await conn.execute(CREATE_LEDGER_DEFAULT_PARTITION)
+    await ensure_partitions(conn)
+    await conn.execute(CREATE_LEDGER_INDEX)
+    await conn.execute(CREATE_CHECKPOINTS)
+    await conn.execute(SEED_OPENING_BALANCES)
+
+
+async def record_events(conn, events):
+    """ Appends (guild_id, user_id, system_name, delta, actor_id, reason) tuples in one statement """
+    if not events:
+        return
+    columns = list(zip(*events))
+    await conn.execute(INSERT_EVENTS, *[list(column) for column in columns])
+
+
+async def fetch_history(conn, guild_id, user_id, system_name, limit, before=None):
+    """ Newest-first page of a member's events; ``before`` is the (created_at, event_id) cursor """
+    if before is None:
+        return await conn.fetch(
+            """
+            SELECT event_id, delta, actor_id, reason, created_at FROM xp_events
+            WHERE guild_id = $1 AND user_id = $2 AND system_name = $3
+            ORDER BY created_at DESC, event_id DESC
+            LIMIT $4
+            """,
+            guild_id, user_id, system_name, limit
+        )
+    return await conn.fetch(
+        """
+        SELECT event_id, delta, actor_id, reason, created_at FROM xp_events
+        WHERE guild_id = $1 AND user_id = $2 AND system_name = $3
+          AND (created_at, event_id) < ($4, $5)
+        ORDER BY created_at DESC, event_id DESC
+        LIMIT $6
+        """,
+        guild_id, user_id, system_name, before[0], before[1], limit
+    )
+
+
+async def rebuild_totals(pool, guild_id, batch_size=XP_REBUILD_BATCH):
+    """ Recomputes user_xp for a guild from checkpoints + events, one user_id range per transaction """
+    rebuilt = 0
+    last_user = -1
+    while True:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                user_ids = await conn.fetch(
+                    """
+                    SELECT DISTINCT user_id FROM (
+                        SELECT user_id FROM xp_events WHERE guild_id = $1 AND user_id > $2
+                        UNION
+                        SELECT user_id FROM xp_ledger_checkpoints WHERE guild_id = $1 AND user_id > $2
+                    ) ids ORDER BY user_id LIMIT $3
+                    """,
+                    guild_id, last_user, batch_size
+                )
+                if not user_ids:
+                    return rebuilt
+                upper = user_ids[-1]["user_id"]
+                result = await conn.execute(
+                    """
+                    INSERT INTO user_xp (guild_id, user_id, system_name, xp)
+                    SELECT guild_id, user_id, system_name, GREATEST(0, SUM(xp))
+                    FROM (
+                        SELECT guild_id, user_id, system_name, delta::bigint AS xp FROM xp_events
+                        WHERE guild_id = $1 AND user_id > $2 AND user_id <= $3
+                        UNION ALL
+                        SELECT guild_id, user_id, system_name, xp FROM xp_ledger_checkpoints
+                        WHERE guild_id = $1 AND user_id > $2 AND user_id <= $3
+                    ) ledger
+                    GROUP BY guild_id, user_id, system_name
+                    ON CONFLICT (guild_id, user_id, system_name)
+                    DO UPDATE SET xp = EXCLUDED.xp
+                    """,
+                    guild_id, last_user, upper
+                )
+                rebuilt += int(result.split()[-1])
+                last_user = upper
+
+
+async def detach_partitions_before(pool, cutoff):
+    """ Folds monthly partitions that end on or before ``cutoff`` into checkpoints and detaches them """
+    detached = []
+    async with pool.acquire() as conn:
+        partitions = await conn.fetch(
+            """
+            SELECT child.relname AS name
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = 'xp_events' AND child.relname ~ '^xp_events_[0-9]{4}_[0-9]{2}$'
+            ORDER BY child.relname
+            """
+        )
+        for row in partitions:
+            name = row["name"]
+            year, month = int(name[10:14]), int(name[15:17])
+            start = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+            if next_month(start) > cutoff:
+                continue
+            async with conn.transaction():
+                await conn.execute(
+                    f"""
+                    INSERT INTO xp_ledger_checkpoints (guild_id, user_id, system_name, xp)
+                    SELECT guild_id, user_id, system_name, SUM(delta) FROM {name}
+                    GROUP BY guild_id, user_id, system_name
+                    ON CONFLICT (guild_id, user_id, system_name)
+                    DO UPDATE SET xp = xp_ledger_checkpoints.xp + EXCLUDED.xp
+                    """
+                )
+                await conn.execute(f"ALTER TABLE xp_events DETACH PARTITION {name}")
+            detached.append(name)
+    return detached
@@ -0,0 +1,768 @@
+import asyncio
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+from cogs.utils import xp_decay, xp_ledger
+from cogs.utils.config import DATA_DIR
+
+XP_BACKEND = os.getenv("XP_BACKEND", "auto").lower()
+XP_SQLITE_DB = os.path.join(DATA_DIR, "xp.db")
+
+# user_xp joined to its guild's decay settings; the join is dropped by the planner when d isn't referenced
+RANKED_FROM = "user_xp u LEFT JOIN xp_decay d ON d.guild_id = u.guild_id"
+
+# Registers systems that were only ever typed as free text, once, before system names were validated
+BACKFILL_SYSTEMS = """
+    INSERT INTO xp_systems (guild_id, system_name)
+    SELECT guild_id, system_name FROM user_xp
+    WHERE NOT EXISTS (SELECT 1 FROM xp_systems)
+    UNION
+    SELECT guild_id, system_name FROM default_xp_system
+    WHERE system_name IS NOT NULL AND NOT EXISTS (SELECT 1 FROM xp_systems)
+    ON CONFLICT DO NOTHING
+"""
+
+
+class XPStore:
+    """ Storage interface behind XPSystem.
+
+    Every backend has the same semantics: awards upsert-add and reset the
+    member's activity, removals are clamped at zero, every change is appended
+    to the ledger with its actor and reason, and effective XP (after the
+    guild's decay curve) is what reads and rankings see. Owed decay is folded
+    into the stored value whenever a row is written. ``ranked`` returns
+    (user_id, xp) pairs in (xp DESC, user_id) order and seeks past ``after``.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._decaying = {}  # guild_id -> whether the guild has an active decay curve
+
+    async def initialize(self):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def add_system(self, guild_id, system_name):
+        """ Registers a system; it becomes the default if the guild has none yet """
+        raise NotImplementedError
+
+    async def set_default(self, guild_id, system_name):
+        raise NotImplementedError
+
+    async def default_system(self, guild_id):
+        """ The guild's default system name, or None """
+        raise NotImplementedError
+
+    async def systems(self, guild_id):
+        """ Names of the guild's registered systems, sorted """
+        raise NotImplementedError
+
+    async def apply_batch(self, batch, events):
+        """ Commits [((guild_id, user_id, system_name), amount)] and their ledger events together """
+        raise NotImplementedError
+
+    async def award_many(self, guild_id, user_ids, system_name, amount, actor_id=None, reason=None):
+        raise NotImplementedError
+
+    async def remove_xp(self, guild_id, user_id, system_name, amount, actor_id=None, reason=None):
+        """ Removes up to ``amount`` XP and returns how much was actually removed """
+        raise NotImplementedError
+
+    async def decay_settings(self, guild_id):
+        """ (curve, grace_days, rate) for the guild, or None """
+        raise NotImplementedError
+
+    async def set_decay(self, guild_id, curve, grace_days, rate):
+        raise NotImplementedError
+
+    async def decay_active(self, guild_id):
+        """ Whether effective XP can differ from stored XP in this guild """
+        if guild_id not in self._decaying:
+            settings = await self.decay_settings(guild_id)
+            self._decaying[guild_id] = settings is not None and settings[0] != "none" and settings[2] > 0
+        return self._decaying[guild_id]
+
+    async def get_xp(self, guild_id, user_id, system_name):
+        """ Effective XP for one member, or None if they have no row """
+        raise NotImplementedError
+
+    async def ranked(self, guild_id, system_name, limit, after=None, skip=0, before=None):
+        """ One leaderboard page of (user_id, xp), highest first.
+
+        ``after`` seeks past a (user_id, xp) row; ``before`` returns the
+        ``limit`` rows ranked just above one, for paging backwards.
+        """
+        raise NotImplementedError
+
+    async def rank_of(self, guild_id, system_name, user_id):
+        """ (xp, rank) for a member, or None if they have no row """
+        raise NotImplementedError
+
+    async def system_xp(self, guild_id, system_name):
+        """ {user_id: effective xp} for every member of a system """
+        raise NotImplementedError
+
+    async def default_system_xp(self, keys):
+        """ (guild_id, user_id, xp) for the given keys that are in their guild's default system """
+        raise NotImplementedError
+
+    async def history(self, guild_id, user_id, system_name, limit, before=None):
+        """ Newest-first ledger events as dicts; ``before`` is a (created_at, event_id) cursor """
+        raise NotImplementedError
+
+    async def rebuild_totals(self, guild_id):
+        """ Recomputes stored totals from the ledger; returns how many rows were written """
+        raise NotImplementedError
+
+    async def archive_before(self, cutoff):
+        """ Folds ledger months ending on or before ``cutoff`` into checkpoints; returns their labels """
+        raise NotImplementedError
+
+
+class PostgresXPStore(XPStore):
+    """ XP storage on the bot's shared asyncpg pool """
+
+    name = "postgres"
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    async def initialize(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS xp_systems (
+                    guild_id BIGINT,
+                    system_name TEXT,
+                    PRIMARY KEY (guild_id, system_name)
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_xp (
+                    guild_id BIGINT,
+                    user_id BIGINT,
+                    system_name TEXT,
+                    xp INTEGER DEFAULT 0,
+                    PRIMARY KEY (guild_id, user_id, system_name)
+                )
+            """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS user_xp_leaderboard_idx
+                ON user_xp (guild_id, system_name, xp DESC, user_id)
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS default_xp_system (
+                    guild_id BIGINT PRIMARY KEY,
+                    system_name TEXT
+                )
+            """)
+            await conn.execute(BACKFILL_SYSTEMS)
+            await xp_decay.initialize_decay(conn)
+            await xp_ledger.initialize_ledger(conn)
+
+    async def add_system(self, guild_id, system_name):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO xp_systems (guild_id, system_name) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                    guild_id, system_name
+                )
+                await conn.execute(
+                    "INSERT INTO default_xp_system (guild_id, system_name) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                    guild_id, system_name
+                )
+
+    async def set_default(self, guild_id, system_name):
+        await self.pool.execute(
+            """
+            INSERT INTO default_xp_system (guild_id, system_name) VALUES ($1, $2)
+            ON CONFLICT (guild_id) DO UPDATE SET system_name = EXCLUDED.system_name
+            """,
+            guild_id, system_name
+        )
+
+    async def default_system(self, guild_id):
+        return await self.pool.fetchval("SELECT system_name FROM default_xp_system WHERE guild_id = $1", guild_id)
+
+    async def systems(self, guild_id):
+        rows = await self.pool.fetch("SELECT system_name FROM xp_systems WHERE guild_id = $1 ORDER BY system_name", guild_id)
+        return [row["system_name"] for row in rows]
+
+    async def _upsert(self, conn, keys, amounts):
+        # Awards count as activity: they restart the member's decay grace period
+        await conn.execute(
+            """
+            INSERT INTO user_xp (guild_id, user_id, system_name, xp, last_activity_at, decayed_at)
+            SELECT k.*, now(), now() FROM unnest($1::bigint[], $2::bigint[], $3::text[], $4::integer[]) AS k
+            ON CONFLICT (guild_id, user_id, system_name)
+            DO UPDATE SET xp = user_xp.xp + EXCLUDED.xp,
+                          last_activity_at = EXCLUDED.last_activity_at,
+                          decayed_at = EXCLUDED.decayed_at
+            """,
+            [key[0] for key in keys], [key[1] for key in keys], [key[2] for key in keys], amounts
+        )
+
+    async def apply_batch(self, batch, events):
+        async with self.pool.acquire() as conn:
+            await xp_ledger.maybe_ensure_partitions(conn)
+            async with conn.transaction():
+                await xp_decay.materialize(conn, [key for key, _ in batch])
+                await xp_ledger.record_events(conn, events)
+                if batch:
+                    await self._upsert(conn, [key for key, _ in batch], [amount for _, amount in batch])
+
+    async def award_many(self, guild_id, user_ids, system_name, amount, actor_id=None, reason=None):
+        keys = [(guild_id, user_id, system_name) for user_id in user_ids]
+        async with self.pool.acquire() as conn:
+            await xp_ledger.maybe_ensure_partitions(conn)
+            async with conn.transaction():
+                await xp_decay.materialize(conn, keys)
+                await xp_ledger.record_events(conn, [key + (amount, actor_id, reason) for key in keys])
+                await self._upsert(conn, keys, [amount] * len(keys))
+
+    async def remove_xp(self, guild_id, user_id, system_name, amount, actor_id=None, reason=None):
+        async with self.pool.acquire() as conn:
+            await xp_ledger.maybe_ensure_partitions(conn)
+            async with conn.transaction():
+                await xp_decay.materialize(conn, [(guild_id, user_id, system_name)])
+                current = await conn.fetchval(
+                    "SELECT xp FROM user_xp WHERE guild_id = $1 AND user_id = $2 AND system_name = $3 FOR UPDATE",
+                    guild_id, user_id, system_name
+                )
+                # The ledger records what was actually removed, so it always sums to the total
+                removed = min(amount, current or 0)
+                if removed:
+                    await conn.execute(
+                        "UPDATE user_xp SET xp = xp - $1 WHERE guild_id = $2 AND user_id = $3 AND system_name = $4",
+                        removed, guild_id, user_id, system_name
+                    )
+                    await xp_ledger.record_events(conn, [(guild_id, user_id, system_name, -removed, actor_id, reason)])
+        return removed
+
+    async def decay_settings(self, guild_id):
+        row = await self.pool.fetchrow("SELECT curve, grace_days, rate FROM xp_decay WHERE guild_id = $1", guild_id)
+        return tuple(row) if row else None
+
+    async def set_decay(self, guild_id, curve, grace_days, rate):
+        await self.pool.execute(
+            """
+            INSERT INTO xp_decay (guild_id, curve, grace_days, rate) VALUES ($1, $2, $3, $4)
+            ON CONFLICT (guild_id) DO UPDATE SET curve = EXCLUDED.curve, grace_days = EXCLUDED.grace_days, rate = EXCLUDED.rate
+            """,
+            guild_id, curve, grace_days, rate
+        )
+        self._decaying.pop(guild_id, None)
+
+    async def _score(self, guild_id):
+        """ SQL for a row's ranking XP: the indexed column, or the decay curve when one is active """
+        return xp_decay.EFFECTIVE_XP if await self.decay_active(guild_id) else "u.xp"
+
+    async def get_xp(self, guild_id, user_id, system_name):
+        return await self.pool.fetchval(
+            f"""
+            SELECT {await self._score(guild_id)} FROM {RANKED_FROM}
+            WHERE u.guild_id = $1 AND u.user_id = $2 AND u.system_name = $3
+            """,
+            guild_id, user_id, system_name
+        )
+
+    async def ranked(self, guild_id, system_name, limit, after=None, skip=0, before=None):
+        # Without decay this is served by user_xp_leaderboard_idx. With decay the
+        # same seek runs over the effective XP of the guild/system's index range.
+        score = await self._score(guild_id)
+        if before is not None:
+            # Walk the index backwards from the first row on screen, then restore the order
+            rows = await self.pool.fetch(
+                f"""
+                SELECT user_id, xp FROM (
+                    SELECT u.user_id, {score} AS xp FROM {RANKED_FROM}
+                    WHERE u.guild_id = $1 AND u.system_name = $2
+                ) ranked
+                WHERE xp > $3 OR (xp = $3 AND user_id < $4)
+                ORDER BY xp, user_id DESC
+                LIMIT $5
+                """,
+                guild_id, system_name, before[1], before[0], limit
+            )
+            return [(row["user_id"], row["xp"]) for row in reversed(rows)]
+        if after is None:
+            rows = await self.pool.fetch(
+                f"""
+                SELECT user_id, xp FROM (
+                    SELECT u.user_id, {score} AS xp FROM {RANKED_FROM}
+                    WHERE u.guild_id = $1 AND u.system_name = $2
+                ) ranked
+                ORDER BY xp DESC, user_id
+                LIMIT $3 OFFSET $4
+                """,
+                guild_id, system_name, limit, skip
+            )
+        else:
+            rows = await self.pool.fetch(
+                f"""
+                SELECT user_id, xp FROM (
+                    SELECT u.user_id, {score} AS xp FROM {RANKED_FROM}
+                    WHERE u.guild_id = $1 AND u.system_name = $2
+                ) ranked
+                WHERE xp < $3 OR (xp = $3 AND user_id > $4)
+                ORDER BY xp DESC, user_id
+                LIMIT $5 OFFSET $6
+                """,
+                guild_id, system_name, after[1], after[0], limit, skip
+            )
+        return [(row["user_id"], row["xp"]) for row in rows]
+
+    async def rank_of(self, guild_id, system_name, user_id):
+        # One range count over (guild_id, system_name, xp DESC, user_id); indexed when decay is off
+        row = await self.pool.fetchrow(
+            f"""
+            WITH scored AS (
+                SELECT u.user_id, {await self._score(guild_id)} AS xp FROM {RANKED_FROM}
+                WHERE u.guild_id = $1 AND u.system_name = $2
+            )
+            SELECT me.xp, 1 + (
+                SELECT COUNT(*) FROM scored s
+                WHERE s.xp > me.xp OR (s.xp = me.xp AND s.user_id < $3)
+            ) AS rank
+            FROM scored me
+            WHERE me.user_id = $3
+            """,
+            guild_id, system_name, user_id
+        )
+        return (row["xp"], row["rank"]) if row else None
+
+    async def system_xp(self, guild_id, system_name):
+        rows = await self.pool.fetch(
+            f"""
+            SELECT u.user_id, {xp_decay.EFFECTIVE_XP} AS xp FROM {RANKED_FROM}
+            WHERE u.guild_id = $1 AND u.system_name = $2
+            """,
+            guild_id, system_name
+        )
+        return {row["user_id"]: row["xp"] for row in rows}
+
+    async def default_system_xp(self, keys):
+        rows = await self.pool.fetch(
+            f"""
+            SELECT u.guild_id, u.user_id, {xp_decay.EFFECTIVE_XP} AS xp
+            FROM unnest($1::bigint[], $2::bigint[], $3::text[]) AS k(guild_id, user_id, system_name)
+            JOIN user_xp u USING (guild_id, user_id, system_name)
+            LEFT JOIN xp_decay d ON d.guild_id = u.guild_id
+            LEFT JOIN default_xp_system s ON s.guild_id = u.guild_id
+            WHERE u.system_name = COALESCE(s.system_name, 'Default')
+            """,
+            [key[0] for key in keys], [key[1] for key in keys], [key[2] for key in keys]
+        )
+        return [(row["guild_id"], row["user_id"], row["xp"]) for row in rows]
+
+    async def history(self, guild_id, user_id, system_name, limit, before=None):
+        async with self.pool.acquire() as conn:
+            rows = await xp_ledger.fetch_history(conn, guild_id, user_id, system_name, limit, before=before)
+        return [dict(row) for row in rows]
+
+    async def rebuild_totals(self, guild_id):
+        return await xp_ledger.rebuild_totals(self.pool, guild_id)
+
+    async def archive_before(self, cutoff):
+        return await xp_ledger.detach_partitions_before(self.pool, cutoff)
+
+
+class SQLiteXPStore(XPStore):
+    """ XP storage in a local SQLite file (or ``:memory:``), for small guilds, tests and benchmarks.
+
+    Uses the same tables as Postgres, with timestamps stored as epoch seconds
+    and the decay curve registered as the ``xp_effective`` SQL function.
+    Queries run on one connection in a worker thread. The ledger is a single
+    table, and archiving folds old months into checkpoints and deletes them.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=XP_SQLITE_DB):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _open(self):
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("xp_effective", 7, xp_decay.effective_xp, deterministic=True)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS xp_systems (
+                guild_id INTEGER,
+                system_name TEXT,
+                PRIMARY KEY (guild_id, system_name)
+            );
+            CREATE TABLE IF NOT EXISTS user_xp (
+                guild_id INTEGER,
+                user_id INTEGER,
+                system_name TEXT,
+                xp INTEGER NOT NULL DEFAULT 0,
+                last_activity_at REAL NOT NULL DEFAULT (strftime('%s', 'now')),
+                decayed_at REAL NOT NULL DEFAULT (strftime('%s', 'now')),
+                PRIMARY KEY (guild_id, user_id, system_name)
+            );
+            CREATE INDEX IF NOT EXISTS user_xp_leaderboard_idx
+            ON user_xp (guild_id, system_name, xp DESC, user_id);
+            CREATE TABLE IF NOT EXISTS default_xp_system (
+                guild_id INTEGER PRIMARY KEY,
+                system_name TEXT
+            );
+            CREATE TABLE IF NOT EXISTS xp_decay (
+                guild_id INTEGER PRIMARY KEY,
+                curve TEXT NOT NULL DEFAULT 'none',
+                grace_days REAL NOT NULL DEFAULT 0,
+                rate REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS xp_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                system_name TEXT NOT NULL,
+                delta INTEGER NOT NULL,
+                actor_id INTEGER,
+                reason TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS xp_events_member_idx
+            ON xp_events (guild_id, user_id, system_name, created_at DESC, event_id DESC);
+            CREATE TABLE IF NOT EXISTS xp_ledger_checkpoints (
+                guild_id INTEGER,
+                user_id INTEGER,
+                system_name TEXT,
+                xp INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id, system_name)
+            );
+        """)
+        conn.execute(BACKFILL_SYSTEMS)
+        conn.execute(
+            """
+            INSERT INTO xp_events (guild_id, user_id, system_name, delta, reason, created_at)
+            SELECT guild_id, user_id, system_name, xp, 'Opening balance', ?
+            FROM user_xp
+            WHERE xp <> 0 AND NOT EXISTS (SELECT 1 FROM xp_events)
+            """,
+            (time.time(),)
+        )
+        return conn
+
+    async def initialize(self):
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._open)
+
+    async def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn, *args, transaction=False):
+        """ Runs ``fn(conn, *args)`` in a worker thread, optionally inside BEGIN IMMEDIATE/COMMIT """
+        def call():
+            with self._lock:
+                if not transaction:
+                    return fn(self._conn, *args)
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(self._conn, *args)
+                    self._conn.execute("COMMIT")
+                    return result
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        return await asyncio.to_thread(call)
+
+    async def _fetchall(self, query, params=()):
+        return await self._run(lambda conn: conn.execute(query, params).fetchall())
+
+    async def _fetchone(self, query, params=()):
+        return await self._run(lambda conn: conn.execute(query, params).fetchone())
+
+    @staticmethod
+    def _materialize(conn, keys, now):
+        owed = []
+        for key in keys:
+            row = conn.execute(
+                """
+                SELECT u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate,
+                       xp_effective(u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate, ?) AS effective
+                FROM user_xp u JOIN xp_decay d ON d.guild_id = u.guild_id
+                WHERE u.guild_id = ? AND u.user_id = ? AND u.system_name = ? AND d.curve <> 'none'
+                """,
+                (now, *key)
+            ).fetchone()
+            if row is not None and row["effective"] != row["xp"]:
+                through = xp_decay.decayed_through(
+                    row["xp"], row["effective"], row["last_activity_at"], row["decayed_at"],
+                    row["curve"], row["grace_days"], row["rate"], now
+                )
+                owed.append((key, row["effective"] - row["xp"], through))
+        conn.executemany(
+            "UPDATE user_xp SET xp = xp + ?, decayed_at = ? WHERE guild_id = ? AND user_id = ? AND system_name = ?",
+            [(delta, through, *key) for key, delta, through in owed]
+        )
+        SQLiteXPStore._record(conn, [key + (delta, None, "Inactivity decay") for key, delta, _ in owed], now)
+
+    @staticmethod
+    def _record(conn, events, now):
+        conn.executemany(
+            "INSERT INTO xp_events (guild_id, user_id, system_name, delta, actor_id, reason, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [tuple(event) + (now,) for event in events]
+        )
+
+    @staticmethod
+    def _upsert(conn, batch, now):
+        conn.executemany(
+            """
+            INSERT INTO user_xp (guild_id, user_id, system_name, xp, last_activity_at, decayed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (guild_id, user_id, system_name)
+            DO UPDATE SET xp = xp + excluded.xp,
+                          last_activity_at = excluded.last_activity_at,
+                          decayed_at = excluded.decayed_at
+            """,
+            [(*key, amount, now, now) for key, amount in batch]
+        )
+
+    async def add_system(self, guild_id, system_name):
+        def add(conn):
+            conn.execute("INSERT INTO xp_systems (guild_id, system_name) VALUES (?, ?) ON CONFLICT DO NOTHING", (guild_id, system_name))
+            conn.execute("INSERT INTO default_xp_system (guild_id, system_name) VALUES (?, ?) ON CONFLICT DO NOTHING", (guild_id, system_name))
+        await self._run(add, transaction=True)
+
+    async def set_default(self, guild_id, system_name):
+        await self._run(lambda conn: conn.execute(
+            """
+            INSERT INTO default_xp_system (guild_id, system_name) VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET system_name = excluded.system_name
+            """,
+            (guild_id, system_name)
+        ))
+
+    async def default_system(self, guild_id):
+        row = await self._fetchone("SELECT system_name FROM default_xp_system WHERE guild_id = ?", (guild_id,))
+        return row["system_name"] if row else None
+
+    async def systems(self, guild_id):
+        rows = await self._fetchall("SELECT system_name FROM xp_systems WHERE guild_id = ? ORDER BY system_name", (guild_id,))
+        return [row["system_name"] for row in rows]
+
+    async def apply_batch(self, batch, events):
+        def apply(conn):
+            now = time.time()
+            self._materialize(conn, [key for key, _ in batch], now)
+            self._record(conn, events, now)
+            self._upsert(conn, batch, now)
+        await self._run(apply, transaction=True)
+
+    async def award_many(self, guild_id, user_ids, system_name, amount, actor_id=None, reason=None):
+        keys = [(guild_id, user_id, system_name) for user_id in user_ids]
+        await self.apply_batch([(key, amount) for key in keys], [key + (amount, actor_id, reason) for key in keys])
+
+    async def remove_xp(self, guild_id, user_id, system_name, amount, actor_id=None, reason=None):
+        key = (guild_id, user_id, system_name)
+
+        def remove(conn):
+            now = time.time()
+            self._materialize(conn, [key], now)
+            row = conn.execute("SELECT xp FROM user_xp WHERE guild_id = ? AND user_id = ? AND system_name = ?", key).fetchone()
+            removed = min(amount, row["xp"] if row else 0)
+            if removed:
+                conn.execute("UPDATE user_xp SET xp = xp - ? WHERE guild_id = ? AND user_id = ? AND system_name = ?", (removed, *key))
+                self._record(conn, [key + (-removed, actor_id, reason)], now)
+            return removed
+        return await self._run(remove, transaction=True)
+
+    async def decay_settings(self, guild_id):
+        row = await self._fetchone("SELECT curve, grace_days, rate FROM xp_decay WHERE guild_id = ?", (guild_id,))
+        return tuple(row) if row else None
+
+    async def set_decay(self, guild_id, curve, grace_days, rate):
+        await self._run(lambda conn: conn.execute(
+            """
+            INSERT INTO xp_decay (guild_id, curve, grace_days, rate) VALUES (?, ?, ?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET curve = excluded.curve, grace_days = excluded.grace_days, rate = excluded.rate
+            """,
+            (guild_id, curve, grace_days, rate)
+        ))
+        self._decaying.pop(guild_id, None)
+
+    async def _score(self, guild_id):
+        if await self.decay_active(guild_id):
+            return "xp_effective(u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate, :now)"
+        return "u.xp"
+
+    async def get_xp(self, guild_id, user_id, system_name):
+        row = await self._fetchone(
+            f"""
+            SELECT {await self._score(guild_id)} AS xp FROM {RANKED_FROM}
+            WHERE u.guild_id = :guild_id AND u.user_id = :user_id AND u.system_name = :system_name
+            """,
+            {"guild_id": guild_id, "user_id": user_id, "system_name": system_name, "now": time.time()}
+        )
+        return row["xp"] if row else None
+
+    async def ranked(self, guild_id, system_name, limit, after=None, skip=0, before=None):
+        params = {"guild_id": guild_id, "system_name": system_name, "limit": limit, "skip": skip, "now": time.time()}
+        seek, order = "", "xp DESC, user_id"
+        if before is not None:
+            # Seek backwards from the first row on screen, then restore the order
+            seek, order = "WHERE xp > :before_xp OR (xp = :before_xp AND user_id < :before_user)", "xp, user_id DESC"
+            params.update(before_user=before[0], before_xp=before[1], skip=0)
+        elif after is not None:
+            seek = "WHERE xp < :after_xp OR (xp = :after_xp AND user_id > :after_user)"
+            params.update(after_user=after[0], after_xp=after[1])
+        rows = await self._fetchall(
+            f"""
+            SELECT user_id, xp FROM (
+                SELECT u.user_id, {await self._score(guild_id)} AS xp FROM {RANKED_FROM}
+                WHERE u.guild_id = :guild_id AND u.system_name = :system_name
+            ) ranked
+            {seek}
+            ORDER BY {order}
+            LIMIT :limit OFFSET :skip
+            """,
+            params
+        )
+        if before is not None:
+            rows.reverse()
+        return [(row["user_id"], row["xp"]) for row in rows]
+
+    async def rank_of(self, guild_id, system_name, user_id):
+        row = await self._fetchone(
+            f"""
+            WITH scored AS (
+                SELECT u.user_id, {await self._score(guild_id)} AS xp FROM {RANKED_FROM}
+                WHERE u.guild_id = :guild_id AND u.system_name = :system_name
+            )
+            SELECT me.xp, 1 + (
+                SELECT COUNT(*) FROM scored s
+                WHERE s.xp > me.xp OR (s.xp = me.xp AND s.user_id < :user_id)
+            ) AS rank
+            FROM scored me
+            WHERE me.user_id = :user_id
+            """,
+            {"guild_id": guild_id, "system_name": system_name, "user_id": user_id, "now": time.time()}
+        )
+        return (row["xp"], row["rank"]) if row else None
+
+    async def system_xp(self, guild_id, system_name):
+        rows = await self._fetchall(
+            f"""
+            SELECT u.user_id, xp_effective(u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate, ?) AS xp
+            FROM {RANKED_FROM}
+            WHERE u.guild_id = ? AND u.system_name = ?
+            """,
+            (time.time(), guild_id, system_name)
+        )
+        return {row["user_id"]: row["xp"] for row in rows}
+
+    async def default_system_xp(self, keys):
+        def fetch(conn):
+            now = time.time()
+            rows = []
+            for key in keys:
+                row = conn.execute(
+                    f"""
+                    SELECT u.guild_id, u.user_id,
+                           xp_effective(u.xp, u.last_activity_at, u.decayed_at, d.curve, d.grace_days, d.rate, ?) AS xp
+                    FROM {RANKED_FROM}
+                    LEFT JOIN default_xp_system s ON s.guild_id = u.guild_id
+                    WHERE u.guild_id = ? AND u.user_id = ? AND u.system_name = ?
+                      AND u.system_name = COALESCE(s.system_name, 'Default')
+                    """,
+                    (now, *key)
+                ).fetchone()
+                if row is not None:
+                    rows.append((row["guild_id"], row["user_id"], row["xp"]))
+            return rows
+        return await self._run(fetch)
+
+    async def history(self, guild_id, user_id, system_name, limit, before=None):
+        params = {"guild_id": guild_id, "user_id": user_id, "system_name": system_name, "limit": limit}
+        seek = ""
+        if before is not None:
+            seek = "AND (created_at < :before_at OR (created_at = :before_at AND event_id < :before_id))"
+            params.update(before_at=before[0].timestamp(), before_id=before[1])
+        rows = await self._fetchall(
+            f"""
+            SELECT event_id, delta, actor_id, reason, created_at FROM xp_events
+            WHERE guild_id = :guild_id AND user_id = :user_id AND system_name = :system_name {seek}
+            ORDER BY created_at DESC, event_id DESC
+            LIMIT :limit
+            """,
+            params
+        )
+        return [
+            dict(row, created_at=datetime.datetime.fromtimestamp(row["created_at"], datetime.timezone.utc))
+            for row in rows
+        ]
+
+    async def rebuild_totals(self, guild_id):
+        def rebuild(conn):
+            return conn.execute(
+                """
+                INSERT INTO user_xp (guild_id, user_id, system_name, xp)
+                SELECT guild_id, user_id, system_name, MAX(0, SUM(xp))
+                FROM (
+                    SELECT guild_id, user_id, system_name, delta AS xp FROM xp_events WHERE guild_id = ?1
+                    UNION ALL
+                    SELECT guild_id, user_id, system_name, xp FROM xp_ledger_checkpoints WHERE guild_id = ?1
+                ) ledger
+                GROUP BY guild_id, user_id, system_name
+                ON CONFLICT (guild_id, user_id, system_name)
+                DO UPDATE SET xp = excluded.xp
+                """,
+                (guild_id,)
+            ).rowcount
+        return await self._run(rebuild, transaction=True)
+
+    async def archive_before(self, cutoff):
+        def archive(conn):
+            cutoff_at = cutoff.timestamp()
+            months = [
+                row[0] for row in conn.execute(
+                    "SELECT DISTINCT strftime('%Y_%m', created_at, 'unixepoch') FROM xp_events WHERE created_at < ? ORDER BY 1",
+                    (cutoff_at,)
+                )
+            ]
+            conn.execute(
+                """
+                INSERT INTO xp_ledger_checkpoints (guild_id, user_id, system_name, xp)
+                SELECT guild_id, user_id, system_name, SUM(delta) FROM xp_events WHERE created_at < ?
+                GROUP BY guild_id, user_id, system_name
+                ON CONFLICT (guild_id, user_id, system_name)
+                DO UPDATE SET xp = xp_ledger_checkpoints.xp + excluded.xp
+                """,
+                (cutoff_at,)
+            )
+            conn.execute("DELETE FROM xp_events WHERE created_at < ?", (cutoff_at,))
+            return [f"xp_events_{month}" for month in months]
+        return await self._run(archive, transaction=True)
+
+
+def make_xp_store(pool, name=XP_BACKEND):
+    """ Builds the configured XP store: ``postgres``, ``sqlite``, ``memory`` or ``auto`` (Postgres when a pool exists) """
+    if name == "auto":
+        name = "postgres" if pool is not None else "sqlite"
+    if name == "postgres":
+        if pool is None:
+            raise RuntimeError("XP_BACKEND=postgres needs Postgres; set DATABASE_URL or pick sqlite/memory.")
+        return PostgresXPStore(pool)
+    if name == "memory":
+        return SQLiteXPStore(":memory:")
+    if name != "sqlite":
+        print(f"⚠️ Unknown XP_BACKEND '{name}', falling back to sqlite.")
+    return SQLiteXPStore(XP_SQLITE_DB)
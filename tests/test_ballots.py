@@ -0,0 +1,26 @@
+from cogs.utils.ballots import RankedTally, encode_ranking
+
+
+def test_ranked_full_tie_is_reported_as_tie():
+    tally = RankedTally(["A", "B"])
+    tally.add(encode_ranking([0, 1]), 1)
+    tally.add(encode_ranking([1, 0]), 1)
+
+    rounds, winner = tally.runoff()
+    lines, verdict = tally.results()
+
+    assert winner is None
+    assert all(loser is None for _, loser in rounds)
+    assert verdict == "⚖️ **Tied** between A, B"
+
+
+def test_ranked_runoff_transfers_eliminated_ballots():
+    tally = RankedTally(["A", "B", "C"])
+    tally.add(encode_ranking([0]), 2)
+    tally.add(encode_ranking([1]), 2)
+    tally.add(encode_ranking([2, 1]), 1)
+
+    rounds, winner = tally.runoff()
+
+    assert rounds[0][1] == 2
+    assert winner == 1
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from cogs.utils.config import ConfigError, GuildConfigStore, JsonConfigBackend
+
+SHIPPED_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Server_info.json")
+
+
+def test_shipped_config_loads():
+    guilds = JsonConfigBackend(SHIPPED_CONFIG).load_all()
+    assert guilds
+    for guild in guilds.values():
+        assert guild["roles"]["xp_perms"] == ["XP Perms"]
+
+
+def test_unparsable_config_is_read_once_per_check(tmp_path):
+    path = tmp_path / "Server_info.json"
+    path.write_text("{not json")
+    backend = JsonConfigBackend(str(path))
+    loads = []
+    load_all = backend.load_all
+    backend.load_all = lambda: loads.append(1) or load_all()
+    store = GuildConfigStore(backend, check_interval=3600)
+
+    for _ in range(3):
+        with pytest.raises(ConfigError):
+            store.guild(1)
+
+    assert len(loads) == 1
+    assert (tmp_path / "Server_info.json.bak").read_text() == "{not json"
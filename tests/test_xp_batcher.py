@@ -0,0 +1,31 @@
+import asyncio
+
+from cogs.utils.xp_batcher import XPBatcher
+
+
+class RecordingStore:
+    def __init__(self):
+        self.batches = []
+
+    async def apply_batch(self, batch, events):
+        self.batches.append((batch, events))
+
+
+def test_batcher_merges_totals_but_keeps_each_ledger_event():
+    async def run():
+        store = RecordingStore()
+        batcher = XPBatcher(store, interval=3600)
+        batcher.add(1, 2, "default", 50, actor_id=3, reason="Deployment attendance")
+        batcher.add(1, 2, "default", 7, actor_id=3, reason="Deployment attendance")
+        await batcher.close()
+        return store.batches
+
+    batches = asyncio.run(run())
+
+    assert len(batches) == 1
+    batch, events = batches[0]
+    assert batch == [((1, 2, "default"), 57)]
+    assert events == [
+        (1, 2, "default", 50, 3, "Deployment attendance"),
+        (1, 2, "default", 7, 3, "Deployment attendance"),
+    ]